@@ -166,6 +166,10 @@ class PageXML(Document):
         return shapely.geometry.box(0, 0, self.get_image_width(), self.get_image_height())
 
 
+class InvalidPageXML(Exception):
+    ...
+
+
 def parse(path) -> PageXML:
     """
     Parsovani xml struktury
@@ -177,13 +181,41 @@ def parse(path) -> PageXML:
         print('File "{}" is not xml'.format(path), file=sys.stderr)
         exit(1)
 
-    schema = element_schema(page_tree.getroot())
-
-    if SCHEMA not in schema:
-        print('Schema "{}" is not supported'.format(schema), file=sys.stderr)
+    try:
+        return from_element(page_tree.getroot())
+    except InvalidPageXML as e:
+        print(e, file=sys.stderr)
         exit(1)
 
+
+def parse_bytes(data: bytes) -> PageXML:
+    """
+    Parsovani xml struktury predane v pameti, napr. v tele pozadavku serveru.
+    Na rozdil od parse pri chybe neukoncuje proces, ale vyhazuje InvalidPageXML
+    """
+
+    try:
+        root = ElementTree.fromstring(data)
+    except ElementTree.ParseError as e:
+        raise InvalidPageXML('Document is not xml: {}'.format(e))
+
+    return from_element(root)
+
+
+def from_element(root: ElementTree.Element) -> PageXML:
+    """
+    Vytvoreni PageXML z korenoveho elementu dokumentu
+    """
+
+    schema = element_schema(root)
+
+    if schema is None or SCHEMA not in schema:
+        raise InvalidPageXML('Schema "{}" is not supported'.format(schema))
+
     struct_schema = {'': schema}
-    page = page_tree.find('Page', struct_schema)
+    page = root.find('Page', struct_schema)
+
+    if page is None:
+        raise InvalidPageXML('Element Page not found')
 
     return PageXML(page, struct_schema)
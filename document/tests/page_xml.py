@@ -0,0 +1,33 @@
+import os
+import unittest
+
+from document import page_xml
+from document.page_xml import InvalidPageXML
+
+DIR = os.path.dirname(os.path.realpath(__file__))
+GROUND_TRUTH_PATH = os.path.join(DIR, '../../reading_order/metric/tests/data/gt.xml')
+
+
+class TestParseBytes(unittest.TestCase):
+    def test_same_as_parse(self):
+        with open(GROUND_TRUTH_PATH, 'rb') as f:
+            xml = page_xml.parse_bytes(f.read())
+
+        expected = page_xml.parse(GROUND_TRUTH_PATH)
+
+        self.assertEqual(list(expected.get_text_regions()), list(xml.get_text_regions()))
+        self.assertEqual(expected.get_image_width(), xml.get_image_width())
+        self.assertEqual(expected.get_reading_order().get_chain_reduction(),
+                         xml.get_reading_order().get_chain_reduction())
+
+    def test_not_xml(self):
+        with self.assertRaises(InvalidPageXML):
+            page_xml.parse_bytes(b'<PcGts')
+
+    def test_unsupported_schema(self):
+        with self.assertRaises(InvalidPageXML):
+            page_xml.parse_bytes(b'<PcGts xmlns="http://example.com/schema"><Page/></PcGts>')
+
+    def test_missing_page(self):
+        with self.assertRaises(InvalidPageXML):
+            page_xml.parse_bytes(b'<PcGts xmlns="http://schema.primaresearch.org/PAGE/gts/pagecontent/2019-07-15"/>')
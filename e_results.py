@@ -5,6 +5,8 @@ import pickle
 
 import torch
 
+from utils.tensor import pad, masked_mean, masked_sum
+
 """
 Pomocne tridy pouzite pri vyhodnoceni chovani jazykoveho modelu
 """
@@ -30,13 +32,14 @@ class EResults(object):
 
     def add_result(self, sample, cond_probabilities, position, read_length, candidate_length, candidates_probabilities=None):
         """
-        Pridani spocteneho vysledku do kolekce
+        Pridani spocteneho vysledku do kolekce,
+        pravdepodobnosti jsou zarovnane dvojice (tensor, delky), viz Estimator.estimate
         """
 
-        cond_probabilities = [prob.to('cpu') for prob in cond_probabilities]
+        cond_probabilities = _to_cpu(cond_probabilities)
 
-        if candidates_probabilities:
-            candidates_probabilities = [prob.to('cpu') for prob in candidates_probabilities]
+        if candidates_probabilities is not None:
+            candidates_probabilities = _to_cpu(candidates_probabilities)
 
         result = EResultItem(self, sample, cond_probabilities, position, read_length, candidate_length, candidates_probabilities)
         self.results.append(result)
@@ -55,7 +58,7 @@ class EResults(object):
 
         # stahnout data na cpu
         for result in self.results:
-            result.probabilities = [prob.to('cpu') for prob in result.probabilities]
+            result.probabilities = _to_cpu(result.get_cond_probs())
 
         with open(name, 'wb') as f:
             pickle.dump(self, f)
@@ -79,18 +82,57 @@ class EResultItem(object):
         return hasattr(self, 'candidate_probabilities')
 
     def get_probs(self):
-        if self.has_probs():
-            return self.candidate_probabilities
-
-        default = []
-        for i, _ in enumerate(self.probabilities):
-            default.append(torch.tensor((.0,)))
+        """
+        Zarovnane nepodminene pravdepodobnosti kandidatu (tensor, delky), pokud nebyly spocteny, jsou nulove
+        """
 
-        return default
+        if self.has_probs() and self.candidate_probabilities is not None:
+            self.candidate_probabilities = _padded(self.candidate_probabilities)
+            return self.candidate_probabilities
 
+        _, lengths = self.get_cond_probs()
+        return torch.zeros((len(lengths), 1)), torch.ones(len(lengths), dtype=torch.long)
 
     def get_cond_probs(self):
+        """
+        Zarovnane podminene pravdepodobnosti kandidatu (tensor, delky)
+        """
+
+        self.probabilities = _padded(self.probabilities)
         return self.probabilities
 
+    def aggregate(self, length, op='mean'):
+        """
+        P(kandidat[:length]|prefix) - P(kandidat[:length]) pro vsechny kandidaty najednou,
+        op - mean nebo sum pravdepodobnosti tokenu
+        """
+
+        if op == 'mean':
+            reduce = masked_mean
+        elif op == 'sum':
+            reduce = masked_sum
+        else:
+            raise Exception('Unknown operation')
+
+        cond_probs, cond_lengths = self.get_cond_probs()
+        probs, lengths = self.get_probs()
+        count = len(cond_lengths)
+
+        return reduce(cond_probs[:, 0:length], cond_lengths.clamp(max=length)) - \
+            reduce(probs[0:count, 0:length], lengths[0:count].clamp(max=length))
+
     def __getitem__(self, item):
         return getattr(self, item)
+
+
+def _to_cpu(probs: tuple) -> tuple:
+    probs, lengths = probs
+    return probs.to('cpu'), lengths
+
+
+def _padded(probs) -> tuple:
+    """
+    Drive ulozene vysledky obsahuji seznam tensoru pro kazdeho kandidata, ty jsou zarovnany pri prvnim pouziti
+    """
+
+    return pad(probs) if isinstance(probs, list) else probs
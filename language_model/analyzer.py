@@ -1,13 +1,18 @@
+import heapq
 import re
 from copy import copy
 
 import torch
 import scipy.special
-from torch import Tensor
 
 from document.stubs import TextRegion as StubTextRegion, Document as StubDocument
-from language_model.model import Model
+from language_model import runtime
+from language_model.batch import run, ReadRequest, EstimateRequest, UnconditionalRequest
+from language_model.cache import DocumentCache
+from language_model.model import Model, convert_precision
+from language_model.scheduler import BatchScheduler
 from reading_order.reading_order import ReadingOrder, Group
+from utils.tensor import pad, masked_mean
 from language_model.vocabulary import Vocabulary
 
 TOKEN_LIMIT = 64
@@ -68,30 +73,16 @@ def is_end_of_sentence(candidate: StubTextRegion):
     return not match
 
 
-def unravel_index(weights, candidates):
-    """
-    Metoda vrati indexy pro source a successor dle nejvetsi hodnoty pravdepodobnosti
-    """
-
-    # beru prvek s nejvetsi pravdepodobnosti
-    max_index = weights.argmax().item()
-
-    # na zaklade indexu matice zjistim id zdroje (source) a naslednika (successor)
-    index_source = max_index // len(candidates)
-    index_successor = max_index % len(candidates)
-
-    keys = list(candidates.keys())
-    key_source = keys[index_source]
-    key_successor = keys[index_successor]
-
-    return key_source, key_successor
-
-
 class AnalyzeSettings(object):
     def __init__(self):
         self.hard_limit = False
         self.analyze_sentences = False
         self.score = False
+        # minimalni pocet tokenu kandidata, ktery je odhadnut modelem, odhady pro mensi limity
+        # jsou pak odvozeny z pravdepodobnosti jednotlivych tokenu ulozenych v cache
+        self.estimate_limit = None
+        # vypis prubehu analyzy (inicializace, pocet zbyvajicich kandidatu) na standardni vystup
+        self.verbose = True
 
 
 class LmAnalyzer(object):
@@ -99,8 +90,12 @@ class LmAnalyzer(object):
         self.model = model
         self.vocab = vocab
         self.settings = AnalyzeSettings()
+        self.cache = None
+        self.scheduler = None
         # defaultni nastaveni
         self.use_score_hard_limit(5)
+        # nastaveni vlaken a CPU afinity, viz language_model.runtime
+        runtime.apply()
 
     def analyze(self, doc: StubDocument) -> ReadingOrder:
         """
@@ -109,9 +104,42 @@ class LmAnalyzer(object):
         dle nejvyssi pravdepodobnosti
         """
 
-        candidates = copy(doc.get_text_regions())
-        candidates = {x: candidates[x] for x in candidates if len(candidates[x].get_text())}
-        return Processor(candidates, self.model, self.vocab, self.settings).analyze()
+        candidates = self._get_candidates(doc)
+        return Processor(candidates, self.model, self.vocab, self.settings, self.cache, self.scheduler).analyze()
+
+    def analyze_limits(self, doc: StubDocument, limits: [int]) -> {int: ReadingOrder}:
+        """
+        Jazykova analyza dokumentu pro vice limitu tokenu najednou, typ analyzy (hard limit, score)
+        se ridi aktualnim nastavenim.
+        Model odhaduje dvojice pouze jednou a to s maximalnim limitem, vysledky pro mensi limity jsou odvozeny
+        z pravdepodobnosti jednotlivych tokenu. Vraci slovnik {limit: ReadingOrder}.
+        """
+
+        cache = self.cache if self.cache is not None else DocumentCache()
+        processors = []
+
+        for limit in limits:
+            settings = copy(self.settings)
+            settings.hard_limit = limit
+            settings.estimate_limit = max(limits)
+
+            candidates = self._get_candidates(doc)
+            processors.append(Processor(candidates, self.model, self.vocab, settings, cache))
+
+        # analyzy jednotlivych limitu bezi soubezne, stejne dvojice jsou tak odhadnuty v jednom pruchodu
+        results = run(self.model, [processor.analyze_steps() for processor in processors], self.scheduler)
+        return dict(zip(limits, results))
+
+    def analyze_many(self, docs: [StubDocument]) -> [ReadingOrder]:
+        """
+        Jazykova analyza vice dokumentu (stranek) najednou, dle aktualniho nastaveni.
+        Analyzy dokumentu bezi soubezne, cteni regionu a odhady dvojic vsech dokumentu jsou v kazdem kroku
+        zpracovany spolecnymi davkami modelu. Vraci ReadingOrder pro kazdy dokument ve stejnem poradi.
+        """
+
+        # kazdy dokument ma vlastni cache, cache nastavena pres use_cache patri jednomu dokumentu
+        processors = [Processor(self._get_candidates(doc), self.model, self.vocab, self.settings) for doc in docs]
+        return run(self.model, [processor.analyze_steps() for processor in processors], self.scheduler)
 
     def analyze_one(self, source: StubTextRegion, candidates: {StubTextRegion}):
         """
@@ -119,7 +147,50 @@ class LmAnalyzer(object):
         vsech Candidates.
         """
 
-        return Processor(candidates, self.model, self.vocab, self.settings).analyze_one(source)
+        processor = Processor(candidates, self.model, self.vocab, self.settings, self.cache, self.scheduler)
+        return processor.analyze_one(source)
+
+    def session(self) -> 'ScoringSession':
+        """
+        Vytvoreni sezeni pro opakovane dotazy analyze_one nad jednim dokumentem, viz ScoringSession
+        """
+
+        return ScoringSession(self)
+
+    def use_precision(self, precision: str):
+        """
+        Nastaveni presnosti vypoctu jazykoveho modelu pro tento analyzator (fp32, bf16),
+        prevedeny model je sdileny mezi analyzatory
+        """
+
+        self.model = convert_precision(self.model, precision)
+
+    def use_cache(self, cache: DocumentCache = None):
+        """
+        Nastaveni cache sdilene mezi vice analyzami stejneho dokumentu (ruzne limity, score, kombinovana analyza).
+        Pro dalsi dokument je vhodne predat novou instanci, pripadne None pro vypnuti sdileni.
+        """
+
+        self.cache = cache
+
+    def use_scheduler(self, scheduler: BatchScheduler = None):
+        """
+        Nastaveni planovace davek sdileneho analyzatory v ruznych vlaknech, pozadavky na model jsou pak
+        zpracovany spolecne s pozadavky ostatnich analyz. None - model je volan primo z vlakna analyzy
+        """
+
+        self.scheduler = scheduler
+
+    def _get_candidates(self, doc: StubDocument) -> {StubTextRegion}:
+        candidates = copy(doc.get_text_regions())
+        return {x: candidates[x] for x in candidates if len(candidates[x].get_text())}
+
+    def set_verbose(self, verbose: bool):
+        """
+        Zapnuti nebo vypnuti vypisu prubehu analyzy, napr. u serveru
+        """
+
+        self.settings.verbose = verbose
 
     def set_soft_limit(self, sentences=False):
         self.settings.score = False
@@ -142,36 +213,134 @@ class LmAnalyzer(object):
         self.settings.analyze_sentences = False
 
 
+class ScoringSession(object):
+    """
+    Sezeni jazykoveho modelu pro jeden dokument, vyuzite kombinovanou analyzou. Kazdy region a sloupec
+    je tokenizovan a precten pouze jednou, nepodminene pravdepodobnosti a odhady dvojic jsou drzeny
+    po celou dobu sezeni. Dotazy analyze_one jsou tak zodpovezeny z jiz spocitanych stavu a vice dotazu
+    lze zpracovat spolecnymi davkami modelu metodou analyze_many.
+
+    Nastaveni analyzatoru je prevzato pri vytvoreni sezeni, pro dalsi dokument je potreba nove sezeni.
+    """
+
+    def __init__(self, lm_analyzer: LmAnalyzer):
+        self.model = lm_analyzer.model
+        self.vocab = lm_analyzer.vocab
+        self.settings = copy(lm_analyzer.settings)
+        self.scheduler = lm_analyzer.scheduler
+        self.cache = lm_analyzer.cache if lm_analyzer.cache is not None else DocumentCache()
+        self.encoded = {}
+        self.unconditional = {}
+
+    def analyze_one(self, source: StubTextRegion, candidates: {StubTextRegion}) -> dict:
+        """
+        Pravdepodobnosti Candidates pro predany Source, viz LmAnalyzer.analyze_one
+        """
+
+        return self.analyze_many([(source, candidates)])[0]
+
+    def analyze_many(self, queries: [tuple]) -> [dict]:
+        """
+        Zpracovani vice dotazu najednou, queries - seznam dvojic (Source, Candidates).
+        Cteni a odhady vsech dotazu jsou spojeny do spolecnych davek modelu, vraci vysledky ve stejnem poradi.
+        """
+
+        processors = [Processor(candidates, self.model, self.vocab, self.settings, self.cache, self.scheduler,
+                                self.encoded, self.unconditional) for _, candidates in queries]
+
+        steps = [processor.analyze_one_steps(source) for processor, (source, _) in zip(processors, queries)]
+        return run(self.model, steps, self.scheduler)
+
+
 class Processor():
-    def __init__(self, candidates: {StubTextRegion}, model: Model, vocab: Vocabulary, settings: AnalyzeSettings):
+    def __init__(self, candidates: {StubTextRegion}, model: Model, vocab: Vocabulary, settings: AnalyzeSettings,
+                 cache: DocumentCache = None, scheduler: BatchScheduler = None, encoded: dict = None,
+                 unconditional: dict = None):
         """
         candidates - textove regiony pro jazykovou analyzu
         model - jazykovy model, se kterym je analyza provedena
         vocab - instance SentencePiece, pomoci ktere je prevedena textova sekvence na sekvenci tokenu
         settings - nastaveni analyzy
+        cache - cache skrytych stavu a odhadu sdilena mezi analyzami stejneho dokumentu
+        scheduler - planovac davek sdileny soubeznymi analyzami, viz language_model.scheduler
+        encoded, unconditional - tokeny a nepodminene pravdepodobnosti sdilene v ramci sezeni, viz ScoringSession
         """
 
         self.vocab = vocab
         self.model = model
         self.candidates = candidates
         self.settings = settings
+        self.cache = cache if cache is not None else DocumentCache()
+        self.scheduler = scheduler
+        # tokeny a klice cache jiz zakodovanych textu {(id, text): (tokeny, klic)}
+        self.encoded = encoded if encoded is not None else {}
+        # nepodminene pravdepodobnosti prefixu {(klic, delka prefixu): pravdepodobnosti}
+        self.unconditional = unconditional if unconditional is not None else {}
+
+        # nasteni tokenu pro vsechny textove sekvence a klicu tokenovych sekvenci v cache,
+        # pod kterymi jsou ulozeny skryte stavy a odhady
+        self.tokens = {}
+        self.keys = {}
+        self._encode(self.candidates)
+        self.end_of_sentences = {}
 
-        # nasteni tokenu pro vsechny textove sekvence
-        tokens = self.vocab.Encode([self.candidates[x].get_text() for x in self.candidates])
-        tokens = [torch.tensor(x) for x in tokens]
-        self.tokens = self._to_dict(self.candidates.keys(), tokens)
+        # halda skore vsech dvojic (-skore, slot source, slot kandidata), kazdy kandidat (i nove spojeny prvek)
+        # dostane vlastni stabilni slot, dvojice se spojenymi prvky jsou z haldy vyrazeny az pri vyberu
+        self.heap = []
+        self.slots = {}
+        self.slot_ids = []
+
+        # nepodminene pravdepodobnosti kandidatu v poradi, v jakem byly kandidati predani,
+        # zarovnane do jednoho tensoru (pravdepodobnosti, delky), viz utils.tensor
+        self.probs = None
+        # prumery nepodminenych pravdepodobnosti {limit: tensor pro vsechny pozice self.probs}
+        self.means = {}
 
-        self.hidden_layers = {}
-        self.results = {}
-        self.end_of_sentences = {}
         self._init_end_of_sentences()
 
+    def _init_probs(self):
+        """
+        V pripade score, prednacteni pravdepodobnosti kandidatu
+        """
+
         if self.settings.score:
-            # v pripade score, prednacteni pravdepodobnosti kandidatu
-            est_tokens = [self.tokens[i][0:self._get_limit(i)] for i in self.tokens]
+            yield from self._init_unconditional(list(self.tokens.keys()))
+
+    def _init_unconditional(self, ids):
+        """
+        Nacteni nepodminenych pravdepodobnosti zacatku kandidatu z cache sdilene v ramci procesu
+        """
+
+        limits = [self._get_limit(i) for i in ids]
+        # prefixy jsou odhadnuty alespon s limitem estimate_limit, aby byly sdileny mezi vice limity
+        prefixes = [self.tokens[i][0:max(limit, self.settings.estimate_limit or 0)] for i, limit in zip(ids, limits)]
+        keys = [(self.keys[i], len(prefix)) for i, prefix in zip(ids, prefixes)]
+
+        missing = {key: prefix for key, prefix in zip(keys, prefixes) if key not in self.unconditional}
+        if missing:
+            probs = yield UnconditionalRequest(list(missing.values()))
+            self.unconditional.update(zip(missing.keys(), probs))
+
+        self.probs = pad([self.unconditional[key][0:limit] for limit, key in zip(limits, keys)])
 
-            read = self.model.read_init()
-            self.probs = self.model.estimate(est_tokens, read)
+    def _encode(self, items: {StubTextRegion}):
+        """
+        Tokenizace textu predanych prvku, jiz zakodovane texty jsou nacteny z self.encoded
+        """
+
+        texts = {i: items[i].get_text() for i in items}
+        missing = [i for i in items if (i, texts[i]) not in self.encoded]
+
+        if missing:
+            for i, tokens in zip(missing, self.vocab.Encode([texts[i] for i in missing])):
+                tokens = torch.tensor(tokens)
+                self.encoded[(i, texts[i])] = (tokens, self.cache.key(self.model, tokens))
+
+        for i in items:
+            self.tokens[i], self.keys[i] = self.encoded[(i, texts[i])]
+
+    def _estimate_pairs(self, pairs):
+        return (yield EstimateRequest(self.cache, pairs, self.settings.estimate_limit))
 
     def _to_dict(self, keys, values):
         return dict(zip(keys, values))
@@ -182,17 +351,20 @@ class Processor():
     def _candidates_count(self):
         return len(self.candidates)
 
+    def _print(self, *values):
+        if self.settings.verbose:
+            print(*values)
+
     def _init_hidden(self):
         """
-        Metoda provede inicializaci skrytych vrstev pro kazdeho kandidata
+        Metoda provede inicializaci skrytych vrstev pro kazdeho kandidata, regiony ruzne delky jsou precteny
+        spolecnym pruchodem modelu (viz Model.read_batch)
         """
 
-        print('init hidden')
+        self._print('init hidden')
 
-        for i in self.candidates:
-            source = self.candidates[i]
-            # 'precteni' kandidata jayzkovym modelem
-            self.hidden_layers[i] = self._read(source)
+        # 'precteni' kandidatu jayzkovym modelem
+        yield ReadRequest(self.cache, [(self.keys[i], self.tokens[i], None) for i in self.candidates])
 
     def _is_end_of_sentence(self, source):
         return is_end_of_sentence(source) if self.settings.analyze_sentences else False
@@ -206,20 +378,25 @@ class Processor():
             source = self.candidates[i]
             self.end_of_sentences[i] = self._is_end_of_sentence(source)
 
-    def _join(self, tensor: Tensor, ordered_group: Group):
+    def _join(self, ordered_group: Group):
         """
         Spojeni kandidatu, pro ktere je odhadhuta nejvetsi pravdepodobnost
         """
 
-        # pro kazdeho kandidata softmax - zjistim pravdepodobnosti
-        weights = scipy.special.softmax(tensor)
-        key_source, key_successor = unravel_index(weights, self.candidates)
+        # softmax je monotonni, dvojici s nejvetsi pravdepodobnosti tedy staci vybrat z haldy
+        key_source, key_successor = self._pop()
         source = self.candidates[key_source]
         successor = self.candidates[key_successor]
 
         # pridani zdroje a naslednika do reading order
         ordered_group.add_candidates(source, successor)
 
+        # skryte stavy spojeneho prvku navazuji na jiz precteny source,
+        # model tedy cte pouze tokeny naslednika, nikoliv cely text spojeneho prvku
+        tokens = torch.cat((self.tokens[key_source], self.tokens[key_successor]))
+        key = self.cache.key(self.model, tokens)
+        yield ReadRequest(self.cache, [(key, tokens, (self.keys[key_source], len(self.tokens[key_source])))])
+
         # odstraneni puvodnich dat
         self._remove_joined(key_source, key_successor)
 
@@ -228,8 +405,8 @@ class Processor():
 
         # nahrazeni novym (sloucenym) prvkem
         self.candidates[id] = item
-        self.hidden_layers[id] = self._read(item)
-        self.tokens[id] = torch.tensor(self.vocab.Encode(item.get_text()))
+        self.keys[id] = key
+        self.tokens[id] = tokens
         self.end_of_sentences[id] = self._is_end_of_sentence(item)
 
         return id
@@ -240,19 +417,23 @@ class Processor():
         Metoda pro Kombinovanou analyzu, zde neni potreba pocitat metodou kazdy s kazdym
         """
 
+        return run(self.model, [self.analyze_one_steps(source)], self.scheduler)[0]
+
+    def analyze_one_steps(self, source: StubTextRegion):
+        """
+        Metoda analyze_one jako generator pozadavku na jazykovy model (viz language_model.batch)
+        """
+
         id = source.get_id()
+        yield from self._init_probs()
 
         # inicializace skrytych stavu dle Source
-        self.hidden_layers[id] = self._read(source)
         self.end_of_sentences[id] = self._is_end_of_sentence(source)
-        self.tokens[id] = torch.tensor(self.vocab.Encode(source.get_text()))
-
-        if self.settings.score:
-            self.probs.append(torch.tensor((.0,)))
+        self._encode({id: source})
+        yield ReadRequest(self.cache, [(self.keys[id], self.tokens[id], None)])
 
         # odhad pravdepodobnosti
-        results = self._estimate(source)
-        del results[id]
+        results = yield from self._estimate(source)
 
         results = list(results.values())
         results = [i.to('cpu') for i in results]
@@ -268,100 +449,171 @@ class Processor():
         pravdepodobnosti kandidatu
         """
 
+        return run(self.model, [self.analyze_steps()], self.scheduler)[0]
+
+    def analyze_steps(self):
+        """
+        Metoda analyze jako generator pozadavku na jazykovy model (viz language_model.batch),
+        umoznuje soubezne zpracovani vice analyz se spolecnymi davkami modelu
+        """
+
         # inicializace ReadingOrder
         reading_order = ReadingOrder()
         ordered_group = reading_order.root.add_ordered_group()
 
-        # inicializace skrytych stavu
-        self._init_hidden()
+        # inicializace nepodminenych pravdepodobnosti a skrytych stavu
+        yield from self._init_probs()
+        yield from self._init_hidden()
 
         # vypis zpracovani
-        print(self._candidates_count())
+        self._print(self._candidates_count())
 
         # matice kazdy s kazdym
-        tensor = self._calculate()
+        yield from self._calculate()
         # spojeni dvou kandidatu dle nejvyssi pravdepodobnost, processed_id - id noveho spojeneho prvku
-        processed_id = self._join(tensor, ordered_group)
+        processed_id = yield from self._join(ordered_group)
 
         # dokud nejsou vsichni kandidati spojeni, procesuju, odhaduju a spojuju
         while len(self.candidates) > 1:
-            print(self._candidates_count())
+            self._print(self._candidates_count())
             # zpracovani noveho, spojeneho prvku, inicializace jeho skrytych stavu
-            tensor = self._calculate_processed(processed_id)
+            yield from self._calculate_processed(processed_id)
             # spojeni dvou kandidatu dle nejvyssi pravdepodobnost, processed_id - id noveho spojeneho prvku
-            processed_id = self._join(tensor, ordered_group)
+            processed_id = yield from self._join(ordered_group)
 
         return reading_order
 
-    def _read(self, source: StubTextRegion):
-        # inicializace skryte vrstvy pro Source
-        return self.model.read_text(source.get_text(), self.vocab)
-
-    def _estimate(self, source: StubTextRegion, candidate: StubTextRegion = None):
+    def _estimate(self, source: StubTextRegion):
         """
-        Odhad pravdepodobnosti.
+        Odhad pravdepodobnosti vsech kandidatu.
         Source - inicializacni sekvence
-        Canididates - kanidati
         """
         limit = self._get_limit(source.get_id())
+        keys = list(self.candidates.keys())
 
-        # zpracovani jen urciteho mnozstvi tokenu
-        if candidate:
-            tokens = [self.tokens[candidate.get_id()][0:limit]]
-        else:
-            tokens = [self.tokens[x][0:limit] for x in self.tokens]
+        # zpracovani jen urciteho mnozstvi tokenu, skryta vrstva pro source je nactena z cache
+        pairs = [(self.keys[source.get_id()], self.keys[x], self.tokens[x], limit) for x in keys]
+        probs, lengths = yield from self._estimate_pairs(pairs)
+        probs = self._mean_probs(probs.unsqueeze(0), lengths.unsqueeze(0), [limit])[0]
 
-        # nacteni skryte vrstvy pro source a odhad pravdepodobnosti
-        hidden = self.hidden_layers[source.get_id()]
-        probs = self.model.estimate(tokens, hidden)
+        return self._to_dict(keys, probs)
+
+    def _mean_probs(self, probs, lengths, limits):
+        """
+        Prevod pravdepodobnosti tokenu kandidatu na jednu hodnotu pro kazdeho kandidata.
+        probs, lengths - zarovnane pravdepodobnosti (viz utils.tensor) ve tvaru (source x kandidat x tokeny)
+        limits - limit kazdeho source
+
+        Vraci tensor (source x kandidat), u score je od kazdeho kandidata odectena nepodminena pravdepodobnost
+        na stejne pozici v self.probs
+        """
+
+        means = masked_mean(probs, lengths)
 
         if self.settings.score:
-            probs = [x.mean() - self.probs[i][0:limit].mean() for i, x in enumerate(probs)]
-        else:
-            probs = [x.mean() for x in probs]
+            count = means.size(1)
+            means = means - torch.stack([self._unconditional_means(limit)[0:count] for limit in limits])
 
-        if candidate:
-            return probs
-        else:
-            return self._to_dict(self.tokens.keys(), probs)
+        return means.to('cpu')
+
+    def _unconditional_means(self, limit):
+        """
+        Prumery nepodminenych pravdepodobnosti prvnich limit tokenu kandidatu (viz _mean_probs). Prumery jsou
+        pro kazdy limit spocteny jen jednou, zarovnane pravdepodobnosti tedy nejsou znovu skladany pri kazdem odhadu.
+        """
+
+        if limit not in self.means:
+            probs, lengths = self.probs
+            self.means[limit] = masked_mean(probs[:, 0:limit], lengths.clamp(max=limit))
+
+        return self.means[limit]
+
+    def _add_slot(self, id):
+        """
+        Prirazeni noveho slotu matice skore danemu kandidatovi
+        """
+
+        self.slots[id] = len(self.slot_ids)
+        self.slot_ids.append(id)
 
-    def _dict_to_tensor(self, dict):
-        tensor = torch.empty((0, len(dict)))
+        return self.slots[id]
 
-        for row in dict:
-            probs = torch.tensor([dict[row][x] for x in dict[row]])
-            tensor = torch.vstack((tensor, probs))
+    def _is_active(self, slot):
+        return self.slots.get(self.slot_ids[slot]) == slot
 
-        tensor.fill_diagonal_(tensor.min() - 1)
-        return tensor
+    def _push(self, source_slots, candidate_slots, scores):
+        """
+        Vlozeni skore dvojic do haldy, kandidat nemuze nasledovat sam sebe
+        """
+
+        for source, candidate, score in zip(source_slots, candidate_slots, scores.tolist()):
+            if source != candidate:
+                heapq.heappush(self.heap, (-score, source, candidate))
+
+    def _pop(self):
+        """
+        Metoda vrati id pro source a successor dvojice s nejvetsim skore.
+        Pri shode skore rozhoduje poradi slotu, stejne jako argmax nad matici kazdy s kazdym.
+        """
+
+        while True:
+            _, source, candidate = heapq.heappop(self.heap)
+
+            # dvojice, jejichz prvky uz byly spojeny, jsou preskoceny
+            if self._is_active(source) and self._is_active(candidate):
+                return self.slot_ids[source], self.slot_ids[candidate]
 
-    def _calculate(self) -> torch.Tensor:
+    def _calculate(self):
         """
         Odhad pravepodobnosti vsech kandidatu metodu kazdy s kazdym
         """
 
-        for i in self.candidates:
-            self.results[i] = self._estimate(self.candidates[i])
+        keys = list(self.tokens.keys())
+        limits = [self._get_limit(i) for i in keys]
+
+        # dvojice (source, kandidat) pro vsechny kombinace, odhadnute najednou v nekolika velkych davkach
+        pairs = [(self.keys[i], self.keys[x], self.tokens[x], limit) for i, limit in zip(keys, limits) for x in keys]
+        probs, lengths = yield from self._estimate_pairs(pairs)
 
-        return self._dict_to_tensor(self.results)
+        # radek matice = source, prumery vsech dvojic najednou
+        n = len(keys)
+        rows = self._mean_probs(probs.view(n, n, -1), lengths.view(n, n), limits).tolist()
+        slots = [self._add_slot(i) for i in keys]
+
+        # kandidat nemuze nasledovat sam sebe
+        self.heap = [(-rows[s][c], s, c) for s in slots for c in slots if s != c]
+        heapq.heapify(self.heap)
 
     def _calculate_processed(self, id):
         """
         Zpracovani noveho prvku, zpracovani radku a sloupce tohoto prvku
         """
 
-        candidate = self.candidates[id]
+        keys = list(self.tokens.keys())
+        sources = [i for i in keys if i != id]
+        limits = [self._get_limit(i) for i in sources]
+        limit = self._get_limit(id)
 
-        # nacteni sloupce
-        for i in self.results:
-            source = self.candidates[i]
-            self.results[i][id] = self._estimate(source, candidate)[0]
+        # sloupec - vsechny source vuci novemu prvku a radek - novy prvek vuci vsem kandidatum,
+        # oboji odhadnuto v jednom pruchodu modelem
+        pairs = [(self.keys[i], self.keys[id], self.tokens[id], l) for i, l in zip(sources, limits)]
+        pairs += [(self.keys[id], self.keys[x], self.tokens[x], limit) for x in keys]
 
-        #nacteni radku
-        source = self.candidates[id]
-        self.results[id] = self._estimate(source)
+        probs, lengths = yield from self._estimate_pairs(pairs)
 
-        return self._dict_to_tensor(self.results)
+        slot = self._add_slot(id)
+        source_slots = [self.slots[i] for i in sources]
+        slots = [self.slots[i] for i in keys]
+
+        # nacteni sloupce, u score je odhad jednoho kandidata normalizovan prvni nepodminenou pravdepodobnosti
+        n = len(sources)
+        if sources:
+            column = self._mean_probs(probs[0:n].unsqueeze(1), lengths[0:n].unsqueeze(1), limits)[:, 0]
+            self._push(source_slots, [slot] * len(source_slots), column)
+
+        # nacteni radku
+        row = self._mean_probs(probs[n:].unsqueeze(0), lengths[n:].unsqueeze(0), [limit])[0]
+        self._push([slot] * len(slots), slots, row)
 
     def _get_limit(self, source_id):
         """
@@ -398,10 +650,9 @@ class Processor():
         Vycisteni od prvku, ktere byly spojeny do noveho elementu
         """
 
-        # odstraneni jejich sloupcu
-        for i in self.results:
-            del self.results[i][key_source]
-            del self.results[i][key_successor]
+        # uvolneni jejich slotu, dvojice v halde jsou tim zneplatneny
+        del self.slots[key_source]
+        del self.slots[key_successor]
 
         # odstraneni textovych sekvenci
         del self.candidates[key_source]
@@ -411,10 +662,6 @@ class Processor():
         del self.tokens[key_source]
         del self.tokens[key_successor]
 
-        # odstraneni radku
-        del self.results[key_source]
-        del self.results[key_successor]
-
-        # odstraneni skrytych stavu
-        del self.hidden_layers[key_source]
-        del self.hidden_layers[key_successor]
+        # odstraneni klicu skrytych stavu
+        del self.keys[key_source]
+        del self.keys[key_successor]
@@ -0,0 +1,121 @@
+from .cache import DocumentCache, unconditional_cache
+from .model import Model, ESTIMATE_BATCH_SIZE
+
+"""
+Soubezne zpracovani vice analyz nad jednim jazykovym modelem.
+Analyza je generator, ktery vraci pozadavky na model (cteni sekvenci, odhady dvojic, nepodminene
+pravdepodobnosti) a ocekava jejich vysledky. Pozadavky vsech analyz jsou v kazdem kole zpracovany
+spolecnymi davkami modelu.
+"""
+
+
+class ReadRequest(object):
+    """
+    Precteni sekvenci do cache dokumentu, viz DocumentCache.read
+    reads - seznam trojic (klic, tokeny, prefix)
+    """
+
+    def __init__(self, cache: DocumentCache, reads: [tuple]):
+        self.cache = cache
+        self.reads = reads
+
+    def __len__(self):
+        return len(self.reads)
+
+    @staticmethod
+    def run(model: Model, requests: list, batch_size=ESTIMATE_BATCH_SIZE) -> list:
+        DocumentCache.read_many(model, [(request.cache, request.reads) for request in requests], batch_size)
+        return [None] * len(requests)
+
+
+class EstimateRequest(object):
+    """
+    Odhad dvojic (prefix, kandidat) z cache dokumentu, viz DocumentCache.estimate
+    """
+
+    def __init__(self, cache: DocumentCache, pairs: [tuple], length: int = None):
+        self.cache = cache
+        self.pairs = pairs
+        self.length = length
+
+    def __len__(self):
+        return len(self.pairs)
+
+    @staticmethod
+    def run(model: Model, requests: list, batch_size=ESTIMATE_BATCH_SIZE) -> list:
+        return DocumentCache.estimate_many(model, [(r.cache, r.pairs, r.length) for r in requests], batch_size)
+
+
+class UnconditionalRequest(object):
+    """
+    Nepodminene pravdepodobnosti prefixu, viz UnconditionalCache.estimate
+    """
+
+    def __init__(self, prefixes: list):
+        self.prefixes = prefixes
+
+    def __len__(self):
+        return len(self.prefixes)
+
+    @staticmethod
+    def run(model: Model, requests: list, batch_size=ESTIMATE_BATCH_SIZE) -> list:
+        probs = unconditional_cache.estimate(model, [prefix for r in requests for prefix in r.prefixes], batch_size)
+
+        results = []
+        for request in requests:
+            results.append(probs[:len(request.prefixes)])
+            probs = probs[len(request.prefixes):]
+
+        return results
+
+
+REQUEST_TYPES = (UnconditionalRequest, ReadRequest, EstimateRequest)
+
+
+def execute(model: Model, request_type, requests: list, batch_size=ESTIMATE_BATCH_SIZE) -> list:
+    """
+    Zpracovani skupiny pozadavku stejneho druhu jednim volanim modelu
+    batch_size - maximalni pocet sekvenci v jednom pruchodu modelem
+    """
+
+    return request_type.run(model, requests, batch_size)
+
+
+def run(model: Model, analyses: list, scheduler=None) -> list:
+    """
+    Zpracovani analyz (generatoru) v lockstepu. V kazdem kole jsou pozadavky vsech rozpracovanych analyz
+    seskupeny dle druhu a kazda skupina je zpracovana jednim volanim modelu.
+    scheduler - BatchScheduler (viz language_model.scheduler), skupiny jsou pak spojeny s pozadavky
+    analyz bezicich v jinych vlaknech
+    Vraci navratove hodnoty analyz ve stejnem poradi.
+    """
+
+    run_group = scheduler.execute if scheduler is not None else execute
+
+    results = [None] * len(analyses)
+    pending = {}
+
+    def advance(i, value):
+        try:
+            pending[i] = analyses[i].send(value)
+        except StopIteration as e:
+            results[i] = e.value
+
+    for i in range(len(analyses)):
+        advance(i, None)
+
+    while pending:
+        requests = dict(pending)
+        pending.clear()
+
+        values = {}
+        for request_type in REQUEST_TYPES:
+            indices = [i for i, request in requests.items() if isinstance(request, request_type)]
+
+            if indices:
+                values.update(zip(indices, run_group(model, request_type, [requests[i] for i in indices])))
+
+        for i in requests:
+            advance(i, values[i])
+
+    return results
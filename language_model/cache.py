@@ -0,0 +1,266 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager, ExitStack
+
+from utils.tensor import pad, unpad
+from .model import Model, ReadState, ESTIMATE_BATCH_SIZE
+
+"""
+Cache vysledku jazykoveho modelu, sdilena mezi vice analyzami stejneho dokumentu,
+pripadne mezi vsemi analyzami v ramci procesu
+"""
+
+# maximalni pocet prefixu, pro ktere jsou drzeny nepodminene pravdepodobnosti
+UNCONDITIONAL_CACHE_SIZE = 100000
+
+
+class PrefixCache(object):
+    """
+    Stavy prectenych sekvenci ulozene v prefixovem stromu tokenu, oddelene pro kazdy model.
+    Umoznuje najit nejdelsi jiz prectenou sekvenci, ktera je prefixem nove ctene sekvence, model pak
+    cte pouze zbyvajici tokeny (napr. sloupec "r1 r2 r3" navazuje na precteny region r1 nebo spojeni "r1 r2").
+    """
+
+    def __init__(self):
+        # {otisk modelu: koren stromu}, uzel je slovnik {token: uzel}, stav uzlu je ulozen pod klicem None
+        self._roots = {}
+
+    def add(self, model: Model, tokens, state: ReadState):
+        node = self._roots.setdefault(model.get_fingerprint(), {})
+
+        for token in tokens.tolist():
+            node = node.setdefault(token, {})
+
+        node[None] = state
+
+    def longest(self, model: Model, tokens) -> (int, ReadState):
+        """
+        Vraci dvojici (delka, stav) nejdelsiho ulozeneho prefixu tokenu, pripadne (0, None)
+        """
+
+        node = self._roots.get(model.get_fingerprint(), {})
+        length, state = 0, None
+
+        for i, token in enumerate(tokens.tolist()):
+            node = node.get(token)
+
+            if node is None:
+                break
+
+            if None in node:
+                length, state = i + 1, node[None]
+
+        return length, state
+
+
+class DocumentCache(object):
+    """
+    Cache pro jeden dokument. Uchovava stavy prectenych sekvenci (ReadState - regiony, spojene prvky, sloupce)
+    a pravdepodobnosti tokenu kandidatu pro jednotlive dvojice (prefix, kandidat).
+
+    Sekvence jsou identifikovany dle modelu a tokenu, vice konfiguraci analyzy (hard limit, score, kombinovana
+    analyza) nad stejnym dokumentem tedy cte a odhaduje kazdou sekvenci a dvojici jen jednou. Cteni nove
+    sekvence navazuje na nejdelsi jiz precteny prefix, viz PrefixCache.
+
+    Cache muze byt sdilena analyzami ve vice vlaknech, cteni a odhady jsou chraneny zamkem.
+    """
+
+    def __init__(self):
+        self._keys = {}
+        self._reads = {}
+        self._pairs = {}
+        self._prefixes = PrefixCache()
+        self._lock = threading.RLock()
+
+    def key(self, model: Model, tokens) -> int:
+        """
+        Vraci stabilni klic tokenove sekvence pro dany model
+        """
+
+        key = (model.get_fingerprint(), tuple(tokens.tolist()))
+
+        with self._lock:
+            if key not in self._keys:
+                self._keys[key] = len(self._keys)
+
+            return self._keys[key]
+
+    def read(self, model: Model, key: int, tokens, prefix: tuple = None) -> ReadState:
+        """
+        Precteni sekvence tokenu, pokud uz nebyla prectena.
+        prefix - dvojice (klic, pocet tokenu) jiz prectene sekvence, na kterou cteni navazuje,
+        model pak cte pouze zbyvajici tokeny. Pokud neni predan, je pouzit nejdelsi precteny prefix z PrefixCache
+        """
+
+        DocumentCache.read_many(model, [(self, [(key, tokens, prefix)])])
+        return self._reads[key]
+
+    def estimate(self, model: Model, pairs: [tuple], length: int = None):
+        """
+        Odhad pravdepodobnosti dvojic (prefix, kandidat), jiz odhadnute dvojice jsou nacteny z cache.
+        pairs - seznam ctveric (klic prefixu, klic kandidata, tokeny kandidata, limit)
+        length - minimalni pocet odhadnutych tokenu kandidata, pro pozdejsi dotazy s vetsim limitem
+
+        Vraci zarovnane pravdepodobnosti (tensor, delky) prvnich limit tokenu kandidatu, radky jsou ve stejnem
+        poradi jako pairs
+        """
+
+        return DocumentCache.estimate_many(model, [(self, pairs, length)])[0]
+
+    @staticmethod
+    def read_many(model: Model, requests: [tuple], batch_size=ESTIMATE_BATCH_SIZE):
+        """
+        Precteni sekvenci do vice cache najednou, vsechny chybejici sekvence cte model spolecne.
+        requests - seznam dvojic (cache, seznam trojic (klic, tokeny, prefix)), viz read
+        batch_size - maximalni pocet sekvenci v jednom pruchodu modelem
+        """
+
+        with _locked([cache for cache, _ in requests]):
+            DocumentCache._read_many(model, requests, batch_size)
+
+    @staticmethod
+    def _read_many(model: Model, requests: [tuple], batch_size=ESTIMATE_BATCH_SIZE):
+        missing = {}
+
+        for cache, reads in requests:
+            for key, tokens, prefix in reads:
+                if key not in cache._reads:
+                    missing[(cache, key)] = (tokens, prefix)
+
+        if missing:
+            tokens = []
+            prefixes = []
+
+            for (cache, _), (sequence, prefix) in missing.items():
+                length, state = cache._prefixes.longest(model, sequence)
+
+                if prefix is not None and prefix[1] > length:
+                    length, state = prefix[1], cache._reads[prefix[0]]
+
+                tokens.append(sequence[length:])
+                prefixes.append(state)
+
+            # pro odhad kandidatu je potreba pouze pravdepodobnost posledniho tokenu, kterou read_batch vraci
+            for (cache, key), read in zip(missing.keys(), model.read_batch(tokens, prefixes, batch_size)):
+                cache._reads[key] = read
+                cache._prefixes.add(model, missing[(cache, key)][0], read)
+
+    @staticmethod
+    def estimate_many(model: Model, requests: [tuple], batch_size=ESTIMATE_BATCH_SIZE) -> [tuple]:
+        """
+        Odhad dvojic (prefix, kandidat) pro vice cache najednou, vsechny chybejici dvojice odhadne model spolecne.
+        requests - seznam trojic (cache, dvojice, length), viz estimate
+        batch_size - maximalni pocet dvojic v jednom pruchodu modelem
+
+        Vraci pro kazdy pozadavek jeden zarovnany blok (tensor, delky), viz estimate, ve stejnem poradi jako requests
+        """
+
+        with _locked([cache for cache, _, _ in requests]):
+            return DocumentCache._estimate_many(model, requests, batch_size)
+
+    @staticmethod
+    def _estimate_many(model: Model, requests: [tuple], batch_size=ESTIMATE_BATCH_SIZE) -> [tuple]:
+        missing = {}
+
+        for cache, pairs, length in requests:
+            for prefix, candidate, tokens, limit in pairs:
+                cached = cache._pairs.get((prefix, candidate))
+
+                if cached is not None and len(cached) >= len(tokens[0:limit]):
+                    continue
+
+                tokens = tokens[0:max(limit, length or 0)]
+
+                if len(tokens) > len(missing.get((cache, prefix, candidate), ())):
+                    missing[(cache, prefix, candidate)] = tokens
+
+        if missing:
+            # vsechny chybejici dvojice jsou odhadnuty najednou
+            prefixes = list(dict.fromkeys((cache, prefix) for cache, prefix, _ in missing))
+            indices = {prefix: i for i, prefix in enumerate(prefixes)}
+
+            reads = [cache._reads[prefix] for cache, prefix in prefixes]
+            pairs = [(indices[(cache, prefix)], tokens) for (cache, prefix, _), tokens in missing.items()]
+
+            # dvojice jsou znovu pouzity pro ruzne source a limity, v cache jsou tedy ulozeny jednotlive
+            # (pohledy do zarovnaneho tensoru odhadu)
+            estimates = unpad(*model.estimate_pairs(reads, pairs, batch_size))
+
+            for (cache, prefix, candidate), probs in zip(missing.keys(), estimates):
+                cache._pairs[(prefix, candidate)] = probs
+
+        return [pad([cache._pairs[(prefix, candidate)][0:limit] for prefix, candidate, _, limit in pairs])
+                for cache, pairs, _ in requests]
+
+
+class UnconditionalCache(object):
+    """
+    LRU cache nepodminenych pravdepodobnosti P(prefix kandidata | <s>), pouzitych pri vypoctu score.
+    Pravdepodobnosti zavisi pouze na modelu a tokenech prefixu, cache je tedy sdilena napric dokumenty,
+    instancemi analyzatoru i volanimi kombinovane analyzy. Velikost je omezena poctem prefixu.
+    """
+
+    def __init__(self, max_size: int = UNCONDITIONAL_CACHE_SIZE):
+        self.max_size = max_size
+        self._probs = OrderedDict()
+        self._init_reads = {}
+        self._lock = threading.RLock()
+
+    def estimate(self, model: Model, prefixes: list, batch_size=ESTIMATE_BATCH_SIZE) -> list:
+        """
+        Vraci nepodminene pravdepodobnosti tokenu predanych prefixu, chybejici prefixy odhadne najednou
+        (po davkach o maximalni velikosti batch_size)
+        """
+
+        with self._lock:
+            return self._estimate(model, prefixes, batch_size)
+
+    def _estimate(self, model: Model, prefixes: list, batch_size=ESTIMATE_BATCH_SIZE) -> list:
+        fingerprint = model.get_fingerprint()
+        keys = [(fingerprint, tuple(tokens.tolist())) for tokens in prefixes]
+        missing = {key: tokens for key, tokens in zip(keys, prefixes) if key not in self._probs}
+
+        if missing:
+            probs = model.estimate(list(missing.values()), self._read_init(model), batch_size)
+            self._probs.update(zip(missing.keys(), unpad(*probs)))
+
+        results = []
+        for key in keys:
+            self._probs.move_to_end(key)
+            results.append(self._probs[key])
+
+        # odstraneni nejdele nepouzitych prefixu
+        while len(self._probs) > self.max_size:
+            self._probs.popitem(last=False)
+
+        return results
+
+    def clear(self):
+        with self._lock:
+            self._probs.clear()
+            self._init_reads.clear()
+
+    def _read_init(self, model: Model) -> ReadState:
+        fingerprint = model.get_fingerprint()
+
+        if fingerprint not in self._init_reads:
+            self._init_reads[fingerprint] = model.read_init()
+
+        return self._init_reads[fingerprint]
+
+
+@contextmanager
+def _locked(caches: [DocumentCache]):
+    """
+    Zamceni vice cache dokumentu, zamky jsou ziskany ve stale stejnem poradi
+    """
+
+    with ExitStack() as stack:
+        for cache in sorted(set(caches), key=id):
+            stack.enter_context(cache._lock)
+
+        yield
+
+
+# cache nepodminenych pravdepodobnosti sdilena v ramci celeho procesu
+unconditional_cache = UnconditionalCache()
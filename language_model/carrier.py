@@ -1,13 +1,35 @@
-from .constants import CS, DE
+import os
+import threading
+
+import torch
+
+from .constants import CS, DE, get_model_path
 from .content import Content, load_content, get_pair_sentences, filter_by_shift_length
 from .content_tokens import ContentTokens, load_content_tokens
-from .model import load_model, Model
+from .model import load_model, load_scripted_model, load_weights, quantize_model, convert_precision, Model, \
+    ScriptedModel, PRECISIONS
 from .vocabulary import Vocabulary, load_vocab
 
 """
 Soubor obsahuje primarne pomocne metody pro nacteni modelu, obsahu trenovaciho korpusu, slovniku SentencePiece
 """
 
+MODEL_NAME = 'LSTM_vocabsize20000_emsize400_nhid1700_nlayers2_dropout0.2_batchsize20_seqlen35.tar'
+# inferencni graf modelu exportovany skriptem language_model_export.py
+SCRIPTED_MODEL_NAME = MODEL_NAME.replace('.tar', '.pt')
+# vahy modelu pro inferenci ulozene skriptem language_model_export.py --format=weights
+WEIGHTS_NAME = MODEL_NAME.replace('.tar', '.weights')
+
+LANGUAGES = {'cs': CS, 'de': DE}
+
+# sdilene instance nactenych modelu {(jazyk, zarizeni, presnost, backend): model}, backend je eager (Pytorch modul)
+# nebo scripted (exportovany TorchScript graf)
+_models = {}
+_models_lock = threading.RLock()
+# sdilene instance slovniku {jazyk: slovnik}
+_vocabs = {}
+
+
 def carrier(device) -> (Content, ContentTokens, Model, Vocabulary):
     v = cs_vocab()
     c = cs_content()
@@ -38,9 +60,85 @@ def cs_content_tokens(vocab: Vocabulary, device: str = 'cpu') -> ContentTokens:
     return load_content_tokens(CS, 'test.txt', vocab, device)
 
 
-def cs_model(device='cpu') -> Model:
-    return load_model(CS, 'LSTM_vocabsize20000_emsize400_nhid1700_nlayers2_dropout0.2_batchsize20_seqlen35.tar', device)
+def cs_model(device='cpu', quantize=False) -> Model:
+    return get_model('cs', device, 'int8' if quantize else 'fp32')
+
+
+def de_model(device='cpu', quantize=False) -> Model:
+    return get_model('de', device, 'int8' if quantize else 'fp32')
+
+
+def get_model(language: str = 'cs', device='cpu', precision: str = 'fp32', scripted: bool = False) -> Model:
+    """
+    Vraci sdilenou instanci modelu pro dany jazyk (cs, de), zarizeni a presnost, model je nacten pouze
+    pri prvnim volani. Pokud existuji vahy ulozene pro inferenci (WEIGHTS_NAME), jsou namapovany do pameti,
+    jinak je nacten cely checkpoint.
+    scripted - model exportovany skriptem language_model_export.py (SCRIPTED_MODEL_NAME), presnost je dana exportem
+    """
+
+    if language not in LANGUAGES:
+        raise ValueError('Unknown language {}'.format(language))
+
+    if precision not in PRECISIONS:
+        raise ValueError('Unknown precision {}'.format(precision))
+
+    if scripted and precision != 'fp32':
+        raise ValueError('Scripted model keeps the precision it was exported with, {} can not be used'
+                         .format(precision))
+
+    key = (language, str(torch.device(device)), precision, 'scripted' if scripted else 'eager')
+
+    with _models_lock:
+        if key not in _models:
+            if scripted:
+                _models[key] = load_scripted_model(get_model_path(LANGUAGES[language], SCRIPTED_MODEL_NAME), device)
+            elif precision == 'int8':
+                _models[key] = quantize_model(get_model(language, device))
+            elif precision != 'fp32':
+                _models[key] = convert_precision(get_model(language, device), precision)
+            else:
+                _models[key] = _load_model(LANGUAGES[language], device)
+
+        return _models[key]
+
+
+def get_vocab(language: str = 'cs') -> Vocabulary:
+    """
+    Vraci sdilenou instanci slovniku pro dany jazyk (cs, de), slovnik je nacten pouze pri prvnim volani
+    """
+
+    if language not in LANGUAGES:
+        raise ValueError('Unknown language {}'.format(language))
+
+    with _models_lock:
+        if language not in _vocabs:
+            _vocabs[language] = load_vocab(LANGUAGES[language], 'train.txt', 20000)
+
+        return _vocabs[language]
+
+
+def clear_models():
+    """
+    Uvolneni vsech sdilenych instanci modelu a slovniku
+    """
+
+    with _models_lock:
+        _models.clear()
+        _vocabs.clear()
+
+
+def _load_model(root: str, device) -> Model:
+    weights = get_model_path(root, WEIGHTS_NAME)
+
+    if os.path.isdir(weights):
+        return load_weights(weights, device)
+
+    return load_model(root, MODEL_NAME, device)
+
+
+def cs_scripted_model(device='cpu') -> ScriptedModel:
+    return get_model('cs', device, scripted=True)
 
 
-def de_model(device='cpu') -> Model:
-    return load_model(DE, 'LSTM_vocabsize20000_emsize400_nhid1700_nlayers2_dropout0.2_batchsize20_seqlen35.tar', device)
+def de_scripted_model(device='cpu') -> ScriptedModel:
+    return get_model('de', device, scripted=True)
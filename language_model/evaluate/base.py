@@ -4,7 +4,9 @@ from abc import abstractmethod, ABC
 import torch
 
 from e_results import EResults
+from language_model import runtime
 from language_model.carrier import carrier
+from language_model.model import ReadState
 
 STRETCH_RIGHT = 'right'
 STRETCH_LEFT = 'left'
@@ -27,6 +29,7 @@ class Base(ABC):
         self.candidates_count = len(offsets)
         self.content, self.content_token, self.model, self.vocab = carrier(device)
         self.start_time = None
+        runtime.apply()
 
         # pokud se pracuje s nahodnymi pozicemi, pak tento parametr urcuje, jestli se nahodne generovane hodnoty
         # maji zapamatovat - pokud ano, pak pri jednotlivych iteracich budou predkladany
@@ -104,7 +107,7 @@ class Base(ABC):
 
         return probs
 
-    def _get_start_hidden(self):
+    def _get_start_hidden(self) -> ReadState:
         if self._start_hidden is None:
             # torch.tensor(1) -- <s> -- start of sequence
             self._start_hidden = self.model.read_init()
@@ -148,7 +151,7 @@ class Base(ABC):
         return torch.randint(0, len(self.content), (1,)).item()
 
     @abstractmethod
-    def _read(self, position, read_count):
+    def _read(self, position, read_count) -> ReadState:
         pass
 
     @abstractmethod
@@ -3,7 +3,9 @@ import time
 import torch
 
 from e_results import EResults
+from language_model import runtime
 from language_model.carrier import cs_vocab, cs_model
+from language_model.model import ReadState
 
 
 class ShiftTokenEvaluate(object):
@@ -26,6 +28,7 @@ class ShiftTokenEvaluate(object):
 
         self.keep_rand_positions = False
         self._rand_positions = {}
+        runtime.apply()
 
 
     def eval(self):
@@ -48,7 +51,7 @@ class ShiftTokenEvaluate(object):
 
         return results
 
-    def _read(self, i, read_count):
+    def _read(self, i, read_count) -> ReadState:
         a, _ = self.pairs[i]
         tokens = a[len(a)-read_count:]
         return self.model.read_tokens(tokens)
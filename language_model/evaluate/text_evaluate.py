@@ -1,3 +1,4 @@
+from language_model.model import ReadState
 from .base import Base, STRETCH_LEFT
 
 
@@ -16,7 +17,7 @@ class TextEvaluate(Base):
 
         return candidates
 
-    def _read(self, position, read_count):
+    def _read(self, position, read_count) -> ReadState:
         """
         Inicializace skrytych stavu textovym obsahem
         """
@@ -1,30 +1,142 @@
+import copy
+import itertools
+import json
+import os
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Optional
+
+import numpy as np
 import torch
+import torch.nn as nn
+import torch.nn.functional as F
 import torch.nn.utils.rnn as rnn_utils
 
 import model as m
+from utils.tensor import mask, cat
 from .constants import get_model_path
 from .vocabulary import Vocabulary
 
+# pocitadlo pro identifikaci modelu, ktere nebyly nacteny funkci load_model
+_model_counter = itertools.count()
+
+# maximalni pocet dvojic (prefix, kandidat), ktere jsou modelem zpracovany v jednom pruchodu
+ESTIMATE_BATCH_SIZE = 256
+
+# presnosti vah, na ktere lze model prevest funkci convert_precision {presnost: datovy typ}
+PRECISION_DTYPES = {'fp32': torch.float32, 'bf16': torch.bfloat16}
+# vsechny podporovane presnosti modelu, int8 je dynamicky kvantizovany model, viz quantize_model
+PRECISIONS = list(PRECISION_DTYPES) + ['int8']
+
+# prevedene modely {model: {presnost: model}}, sdilene napric analyzatory
+_precision_models = weakref.WeakKeyDictionary()
+# podpora LSTM v bf16 v nainstalovane verzi Pytorch {typ zarizeni: bool}, viz _check_bf16_support
+_bf16_support = {}
+
+# nazev konfigurace ulozene spolecne s exportovanym modelem
+EXPORT_CONFIG = 'config.json'
+# nazev konfigurace ve slozce s vahami modelu, viz save_weights
+WEIGHTS_CONFIG = 'config.json'
 
-class Model(m.RNNModel):
+# metody inicializace parametru modulu modelu, preskocene pri nacteni vah (viz _skip_init)
+_INIT_METHODS = ((nn.Embedding, 'reset_parameters'), (nn.Linear, 'reset_parameters'),
+                 (nn.RNNBase, 'reset_parameters'), (m.RNNModel, 'init_weights'))
+_skip_init_lock = threading.Lock()
+_skip_init_state = threading.local()
+
+
+class ReadState(object):
     """
-    Trida dedi Pytorch modul LSTM site,
-    poskytuje pomocne metody
+    Stav po precteni sekvence tokenu: skryte stavy LSTM (h, c) a log pravdepodobnosti tokenu nasledujiciho
+    za sekvenci (1 x velikost slovniku). Pravdepodobnosti ostatnich pozic sekvence se pro odhad kandidatu
+    nepouzivaji a nejsou tedy drzeny.
     """
 
-    def read_tokens(self, tokens):
+    def __init__(self, probs: torch.Tensor, hidden: tuple):
+        self.probs = probs
+        self.hidden = hidden
+
+    @staticmethod
+    def batch(states: ['ReadState']) -> (torch.Tensor, tuple):
         """
-        Inicializace skrytych stavu na zaklade predanych tokenu
+        Spojeni vice stavu, vraci dvojici (pravdepodobnosti (pocet stavu x velikost slovniku), (h, c))
         """
 
-        hidden = self.init_hidden(1)
-        tokens = tokens.view(1, -1).t()
+        probs = torch.cat([state.probs for state in states])
+        h = torch.cat([state.hidden[0] for state in states], dim=1)
+        c = torch.cat([state.hidden[1] for state in states], dim=1)
+
+        return probs, (h, c)
+
+
+class Estimator(object):
+    """
+    Pomocne metody pro cteni sekvenci a odhad pravdepodobnosti kandidatu.
+    Vyuzivaji pouze zakladni operace modelu (forward_last, forward_last_packed, score_packed,
+    init_hidden, _get_device), ktere poskytuje jak Pytorch modul, tak exportovany inferencni graf.
+    """
+
+    # identifikace modelu (checkpoint a zarizeni), nastavena pri nacteni modelu
+    fingerprint = None
+    # presnost vah modelu (fp32, bf16, int8)
+    precision = 'fp32'
+
+    def read_tokens(self, tokens, read: ReadState = None) -> ReadState:
+        """
+        Inicializace skrytych stavu na zaklade predanych tokenu.
+        Pokud je predan jiz precteny prefix (read), cteni navazuje na jeho skryte stavy
+        a model zpracuje pouze predane tokeny.
+        """
+
+        hidden = self.init_hidden(1) if read is None else read.hidden
+        tokens = tokens.view(1, -1).t().to(self._get_device())
+
+        with torch.no_grad():  # no tracking history
+            # vyhodnoceni vstupni sekvence, dekodovana je pouze posledni pozice
+            probs, hidden = self.forward_last(tokens, hidden)
+
+        return ReadState(probs, hidden)
+
+    def read_batch(self, tokens: list, reads: [ReadState] = None, batch_size=ESTIMATE_BATCH_SIZE) -> [ReadState]:
+        """
+        Precteni vice sekvenci tokenu najednou.
+        reads - pro kazdou sekvenci jiz precteny prefix, na ktery cteni navazuje, pripadne None (cteni od zacatku)
+
+        Sekvence ruzne delky jsou zabaleny do PackedSequence a modelem zpracovany v jednom pruchodu
+        (po davkach o maximalni velikosti batch_size), skryte stavy kazde sekvence tedy odpovidaji jeji
+        skutecne delce. Vraci pro kazdou sekvenci ReadState, ve stejnem poradi jako tokens.
+        """
+
+        if reads is None:
+            reads = [None] * len(tokens)
+
+        # prazdna sekvence nemeni stav jiz precteneho prefixu
+        indices = [i for i, sequence in enumerate(tokens) if len(sequence) > 0 or reads[i] is None]
+        outputs = [None if len(sequence) > 0 or reads[i] is None else reads[i] for i, sequence in enumerate(tokens)]
+
+        for start in range(0, len(indices), batch_size):
+            batch = indices[start:start + batch_size]
+
+            for i, read in zip(batch, self._read_packed([tokens[i] for i in batch], [reads[i] for i in batch])):
+                outputs[i] = read
+
+        return outputs
+
+    def _read_packed(self, tokens: list, reads: list) -> [ReadState]:
+        device = self._get_device()
+        input = rnn_utils.pack_sequence([sequence.view(-1) for sequence in tokens], enforce_sorted=False)
+
+        init = self.init_hidden(1)
+        h = torch.cat([(init if read is None else read.hidden)[0] for read in reads], dim=1)
+        c = torch.cat([(init if read is None else read.hidden)[1] for read in reads], dim=1)
 
         with torch.no_grad():  # no tracking history
-            # vyhodnoceni vstupni sekvence
-            return self(tokens, hidden)
+            probs, (h, c) = self.forward_last_packed(input.to(device), (h, c))
+
+        return [ReadState(probs[j:j + 1], (h[:, j:j + 1], c[:, j:j + 1])) for j in range(len(tokens))]
 
-    def read_text(self, text: str, vocab: Vocabulary):
+    def read_text(self, text: str, vocab: Vocabulary) -> ReadState:
         """
         Inicializace skrytych stavu na zaklade predaneho textu
         """
@@ -32,82 +144,290 @@ class Model(m.RNNModel):
         tokens = vocab.text_to_token_tensor(text).to(self._get_device())
         return self.read_tokens(tokens)
 
-    def read_init(self):
+    def read_init(self) -> ReadState:
         """
         Inicializace skrytych vrstev pomoci tokenu <s> -- start of sequence
         """
 
         return self.read_tokens(torch.tensor(1).to(self._get_device()))
 
-    def estimate(self, tokens, hidden):
+    def estimate(self, tokens, read: ReadState, batch_size=ESTIMATE_BATCH_SIZE):
         """
-        Odhad pravdepodobnosti pro kandidaty (tokens) na zaklade prefixu (hidden)
+        Odhad pravdepodobnosti pro kandidaty (tokens) na zaklade precteneho prefixu (read),
+        vraci zarovnane pravdepodobnosti (tensor, delky), viz estimate_pairs
         """
-        prefix_probs, hidden = hidden
-        candidates_count = len(tokens)
 
-        # rozkopirovani skryte vrstvy pro kazdeho kandidata
-        hidden = self._prepare_hidden_for_candidates(hidden, candidates_count)
-        # Posledni prvek skryte vrstvy cteneho textu predstavuje pravdepodobnost prvniho tokenu kandidata
-        prob_of_first_token = prefix_probs[-1:]
+        return self.estimate_pairs([read], [(0, x) for x in tokens], batch_size)
+
+    def estimate_pairs(self, reads, pairs, batch_size=ESTIMATE_BATCH_SIZE):
+        """
+        Odhad pravdepodobnosti pro libovolne dvojice (prefix, kandidat).
+        reads - seznam prectenych prefixu (ReadState, vystupy metod read_tokens a read_batch)
+        pairs - seznam dvojic (index prefixu v reads, tokeny kandidata)
+
+        Vraci dvojici (pravdepodobnosti, delky), pravdepodobnosti tokenu kandidatu jsou zarovnany do jednoho
+        tensoru (radek = dvojice, ve stejnem poradi, v jakem jsou predany dvojice), viz utils.tensor.
+
+        Skryte vrstvy vsech prefixu jsou poskladany vedle sebe a dvojice jsou modelem protahnuty
+        v nekolika velkych davkach o maximalni velikosti batch_size.
+        """
+
+        prefix_probs, hidden = ReadState.batch(reads)
+
+        return cat([self._estimate_batch(prefix_probs, hidden, pairs[start:start + batch_size])
+                    for start in range(0, len(pairs), batch_size)])
+
+    def _estimate_batch(self, prefix_probs, hidden, pairs):
+        indices = [index for index, _ in pairs]
+        tokens = [candidate_tokens for _, candidate_tokens in pairs]
 
         # zarovnani tokenu na stejnou delku
         padding_tokens = self._padding_tokens(tokens)
 
-        # protahnuti tokenu modelem
-        with torch.no_grad():  # no tracking history
-            probs, _ = self(padding_tokens, hidden, False)
+        # Posledni prvek skryte vrstvy cteneho textu predstavuje pravdepodobnost prvniho tokenu kandidata
+        prob_of_first_token = prefix_probs[indices, padding_tokens[0]]
 
-        # Vypocteme pocet tokenu jednotlivych kandidatu.
-        # Dulezite predevsim pri zpracovani poctu slov, kdy kazde slovo muze byt slozeno z vice tokenu
-        # a tedy i kazdy kandidat muze mit jiny pocet tokenu
-        candidate_tokens_count = self._candidate_tokens_count(tokens)
+        probs = prefix_probs.new_zeros((len(padding_tokens) - 1, len(pairs)))
+        # modelem jsou protahnuti pouze kandidati s vice nez jednim tokenem
+        longer = [i for i, candidate_tokens in enumerate(tokens) if len(candidate_tokens) > 1]
 
-        outputs = []
-        # Priprava vystupnich pravdepodobnosti pro kazdeho kandidata.
-        # Kvuli paddingu je nutne si vytahnout jen tolik hodnot, kolik odpovida puvodnimu poctu tokenu na daneho kandidata
-        for i, tokens_count_of_candidate in enumerate(candidate_tokens_count):
-            # Pro daneho kandidata nacteme pravdepodobnosti zbylych tokenu, krome posledniho (ten nepotrebujeme).
-            # Je dulezite nacitat 0:tokens_count_of_candidate, kde tokens_count_of_candidate predstavuje pocet tokenu
-            # kandidata pred zarovnanim (padding).
-            prob_of_next_tokens = probs[:, i][0:tokens_count_of_candidate - 1]
-            outputs.append(torch.cat((prob_of_first_token, prob_of_next_tokens)))
+        if longer:
+            # vyber skryte vrstvy prislusneho prefixu pro kazdou dvojici
+            hidden = self._prepare_hidden_for_pairs(hidden, [indices[i] for i in longer])
 
-        # Vytahnuti pravdepodobnosti
-        return self._process_probs(candidates_count, tokens, outputs)
+            # Protahnuti tokenu modelem. Vystup posledniho tokenu nepotrebujeme, model tedy cte vsechny tokeny
+            # krome posledniho a vraci pouze pravdepodobnosti nasledujicich tokenu kandidata.
+            # Sekvence jsou zabaleny dle delky, pozice paddingu tedy model vubec nepocita
+            input = rnn_utils.pack_sequence([tokens[i][:-1] for i in longer], enforce_sorted=False)
+            targets = rnn_utils.pack_sequence([tokens[i][1:] for i in longer], enforce_sorted=False)
+            input = input.to(self._get_device())
 
-    def _candidate_tokens_count(self, tokens):
-        return [len(x) for x in tokens]
+            with torch.no_grad():  # no tracking history
+                scores, _ = self.score_packed(input, hidden, targets.data.to(self._get_device()))
 
-    def _process_probs(self, candidates_count, tokens, output):
-        probabilities = []
-        candidate_tokens_count = self._candidate_tokens_count(tokens)
+            scores, _ = rnn_utils.pad_packed_sequence(input._replace(data=scores))
+            probs[0:len(scores), torch.tensor(longer, device=probs.device)] = scores
 
-        for i in range(0, candidates_count):
-            indices = range(0, candidate_tokens_count[i])
-            probs = output[i][indices, tokens[i]]
-            probabilities.append(probs)
+        # Vystupni pravdepodobnosti vsech kandidatu v jednom tensoru (radek = kandidat), pozice za koncem
+        # kandidata jsou kvuli paddingu vynulovany
+        lengths = torch.tensor([len(candidate_tokens) for candidate_tokens in tokens])
+        probs = torch.cat((prob_of_first_token.unsqueeze(1), probs.t()), dim=1)
 
-        return probabilities
+        return probs.masked_fill(~mask(lengths, probs.size(1), probs.device), 0), lengths
 
     def _padding_tokens(self, candidate_tokens):
         # zarovname tokeny na stejnou velikost - hodnota paddingu 0, zarovnani na delku nejdelsi sekvence tokenu
         return rnn_utils.pad_sequence(candidate_tokens).to(self._get_device())
 
-    def _prepare_hidden_for_candidates(self, hidden, candidate_count):
-        # naklonujeme skrytou vrstvu a vrstvu s hodnotami bunek site
-        h = torch.repeat_interleave(hidden[0], candidate_count, dim=1)
-        c = torch.repeat_interleave(hidden[1], candidate_count, dim=1)
+    def _prepare_hidden_for_pairs(self, hidden, indices):
+        # pro kazdou dvojici vybereme skrytou vrstvu a vrstvu s hodnotami bunek site jejiho prefixu
+        indices = torch.tensor(indices, device=hidden[0].device)
+        h = hidden[0].index_select(1, indices)
+        c = hidden[1].index_select(1, indices)
 
         return h, c
 
+    def get_fingerprint(self) -> str:
+        """
+        Vraci identifikaci modelu, pouzitou jako klic pri cachovani vysledku
+        """
+
+        if self.fingerprint is None:
+            self.fingerprint = 'model-{}'.format(next(_model_counter))
+
+        return self.fingerprint
+
+
+class Model(Estimator, m.RNNModel):
+    """
+    Trida dedi Pytorch modul LSTM site,
+    poskytuje pomocne metody
+    """
+
     def _get_device(self):
         return next(self.parameters()).device
 
 
-def load_model(path, name, device) -> Model:
+class InferenceModule(nn.Module):
+    """
+    Inferencni graf RNNModel pro export do TorchScript. Neobsahuje dropout a vypocet skore cilovych tokenu
+    (dekoder, normalizace a vyber tokenu) je soucasti grafu. Normalizace probiha ve fp32 i u modelu v bf16,
+    stejne jako v RNNModel.
+    """
+
+    def __init__(self, model: m.RNNModel):
+        super(InferenceModule, self).__init__()
+        self.encoder = model.encoder
+        self.rnn = copy.deepcopy(model.rnn)
+        self.rnn.dropout = 0.0
+        self.decoder = model.decoder
+
+    def _decode(self, output):
+        # stejne jako RNNModel._decode, dekoder v bf16 je normalizovan ve fp32
+        decoded = self.decoder(output)
+        if decoded.dtype == torch.bfloat16 or decoded.dtype == torch.float16:
+            decoded = decoded.float()
+        return decoded
+
+    @torch.jit.export
+    def forward_last(self, input, h, c):
+        output, (h, c) = self.rnn(self.encoder(input), (h, c))
+        decoded = self._decode(output[-1])
+        return F.log_softmax(decoded, dim=1), h, c
+
+    @torch.jit.export
+    def forward_last_packed(self, data, batch_sizes, sorted_indices: Optional[torch.Tensor],
+                            unsorted_indices: Optional[torch.Tensor], h, c):
+        input = rnn_utils.PackedSequence(self.encoder(data), batch_sizes, sorted_indices, unsorted_indices)
+        _, (h, c) = self.rnn(input, (h, c))
+        decoded = self._decode(h[-1])
+        return F.log_softmax(decoded, dim=1), h, c
+
+    @torch.jit.export
+    def score_packed(self, data, batch_sizes, sorted_indices: Optional[torch.Tensor],
+                     unsorted_indices: Optional[torch.Tensor], h, c, targets):
+        input = rnn_utils.PackedSequence(self.encoder(data), batch_sizes, sorted_indices, unsorted_indices)
+        output, (h, c) = self.rnn(input, (h, c))
+        decoded = self._decode(output.data)
+        normalizer = torch.logsumexp(decoded, dim=1)
+        return decoded.gather(1, targets.unsqueeze(1)).squeeze(1) - normalizer, h, c
+
+
+class ScriptedModel(Estimator):
+    """
+    Model nad exportovanym TorchScript grafem (viz export_model), poskytuje stejne metody jako Model.
+    Graf je vyhodnocovan bez rezie eager modu Pytorch, vhodne predevsim pro kratke sekvence tokenu.
+    """
+
+    def __init__(self, module, nlayers: int, nhid: int, dtype, device):
+        self.module = module
+        self.nlayers = nlayers
+        self.nhid = nhid
+        self.dtype = dtype
+        self.device = torch.device(device)
+
+    def forward_last(self, input, hidden):
+        probs, h, c = self.module.forward_last(input, hidden[0], hidden[1])
+        return probs, (h, c)
+
+    def forward_last_packed(self, input, hidden):
+        probs, h, c = self.module.forward_last_packed(input.data, input.batch_sizes, input.sorted_indices,
+                                                      input.unsorted_indices, hidden[0], hidden[1])
+        return probs, (h, c)
+
+    def score_packed(self, input, hidden, targets):
+        probs, h, c = self.module.score_packed(input.data, input.batch_sizes, input.sorted_indices,
+                                               input.unsorted_indices, hidden[0], hidden[1], targets)
+        return probs, (h, c)
+
+    def init_hidden(self, bsz):
+        return (torch.zeros(self.nlayers, bsz, self.nhid, dtype=self.dtype, device=self.device),
+                torch.zeros(self.nlayers, bsz, self.nhid, dtype=self.dtype, device=self.device))
+
+    def _get_device(self):
+        return self.device
+
+
+def export_model(model: Model, filepath: str):
+    """
+    Export modelu do TorchScript souboru pro inferenci, nacteni funkci load_scripted_model.
+    Graf je zmrazen, vahy jsou tedy soucasti grafu jako konstanty.
+    """
+
+    module = torch.jit.script(InferenceModule(model).eval())
+    module = torch.jit.freeze(module, preserved_attrs=['forward_last', 'forward_last_packed', 'score_packed'])
+
+    dtype = str(model.encoder.weight.dtype).replace('torch.', '')
+    config = {'nlayers': model.nlayers, 'nhid': model.nhid, 'dtype': dtype}
+    torch.jit.save(module, filepath, _extra_files={EXPORT_CONFIG: json.dumps(config)})
+
+
+def load_scripted_model(filepath: str, device='cpu') -> ScriptedModel:
+    """
+    Funkce pro nacteni modelu exportovaneho funkci export_model
+    """
+
+    files = {EXPORT_CONFIG: ''}
+    module = torch.jit.load(filepath, map_location=torch.device(device), _extra_files=files)
+    config = json.loads(files[EXPORT_CONFIG])
+
+    model = ScriptedModel(module, config['nlayers'], config['nhid'], getattr(torch, config['dtype']), device)
+    model.fingerprint = '{}@{}'.format(os.path.abspath(filepath), device)
+    return model
+
+
+def quantize_model(model: Model) -> Model:
+    """
+    Dynamicka int8 kvantizace LSTM a dekoderu pro inferenci na CPU. Vahy jsou ulozeny v int8,
+    aktivace jsou kvantizovany az za behu. Vraci novou instanci modelu, puvodni model zustava beze zmeny.
+    """
+
+    if model._get_device().type != 'cpu':
+        raise ValueError('Quantized model is supported only on CPU')
+
+    quantized = torch.quantization.quantize_dynamic(model, {nn.LSTM, nn.Linear}, dtype=torch.qint8)
+    quantized.fingerprint = '{}+int8'.format(model.get_fingerprint())
+    quantized.precision = 'int8'
+    return quantized
+
+
+def convert_precision(model: Model, precision: str) -> Model:
+    """
+    Vraci model s vahami v dane presnosti (fp32, bf16). Pri bf16 bezi LSTM i dekoder v bf16, log pravdepodobnosti
+    jsou ale normalizovany ve fp32. Prevedeny model je sdileny pro vsechna volani se stejnym modelem a presnosti.
+    """
+
+    if not isinstance(model, Model):
+        # exportovany graf ma presnost danou exportem, viz export_model
+        raise ValueError('Precision can be converted only for Model, not {}'.format(type(model).__name__))
+
+    if precision not in PRECISION_DTYPES:
+        raise ValueError('Unknown precision {}'.format(precision))
+
+    if precision == model.precision:
+        return model
+
+    if model.precision == 'int8':
+        raise ValueError('Quantized model can not be converted to {}'.format(precision))
+
+    if precision == 'bf16':
+        _check_bf16_support(model._get_device())
+
+    models = _precision_models.setdefault(model, {})
+
+    if precision not in models:
+        converted = copy.deepcopy(model).to(PRECISION_DTYPES[precision])
+        converted.precision = precision
+        converted.fingerprint = '{}+{}'.format(model.get_fingerprint(), precision)
+        models[precision] = converted
+
+    return models[precision]
+
+
+def _check_bf16_support(device: torch.device):
+    """
+    Starsi verze Pytorch (vcetne verze z requirements.txt) nemusi mit implementaci LSTM v bf16, chyba by se
+    jinak projevila az pri prvnim odhadu. Podpora je overena jednim pruchodem male LSTM site.
+    """
+
+    if device.type not in _bf16_support:
+        try:
+            lstm = nn.LSTM(2, 2).to(device=device, dtype=torch.bfloat16)
+            lstm(torch.zeros(1, 1, 2, device=device, dtype=torch.bfloat16))
+            _bf16_support[device.type] = True
+        except RuntimeError:
+            _bf16_support[device.type] = False
+
+    if not _bf16_support[device.type]:
+        raise RuntimeError('Pytorch {} does not support bf16 LSTM on {}, use fp32 or a newer Pytorch'
+                           .format(torch.__version__, device.type))
+
+
+def load_model(path, name, device, quantize=False, precision='fp32') -> Model:
     """
     Funkce pro nacteni modelu
+    quantize - int8 kvantizace modelu pro rychlejsi inferenci na CPU
+    precision - presnost vah modelu, viz convert_precision
     """
     filepath = get_model_path(path, name)
 
@@ -119,4 +439,96 @@ def load_model(path, name, device) -> Model:
         model.load_state_dict(checkpoint['model_state_dict'])
         model.eval()
         model.to(device)
-        return model
+        model.fingerprint = '{}@{}'.format(filepath, device)
+
+        if quantize:
+            model = quantize_model(model)
+
+        return convert_precision(model, precision)
+
+
+def save_weights(model: Model, directory: str):
+    """
+    Ulozeni vah modelu ve formatu pouze pro inferenci: slozka s konfiguraci (config.json) a jednim npy souborem
+    pro kazdy tensor. Soubor je mozne namapovat do pameti, viz load_weights.
+    """
+
+    os.makedirs(directory, exist_ok=True)
+
+    config = {
+        'model': model.rnn_type, 'ntoken': model.ntoken, 'emsize': model.encoder.embedding_dim, 'nhid': model.nhid,
+        'nlayers': model.nlayers, 'tied': model.decoder.weight is model.encoder.weight,
+    }
+
+    with open(os.path.join(directory, WEIGHTS_CONFIG), 'w') as f:
+        json.dump(config, f)
+
+    for name, tensor in model.state_dict().items():
+        if config['tied'] and name == 'decoder.weight':
+            continue
+
+        np.save(os.path.join(directory, name + '.npy'), tensor.detach().to('cpu').numpy())
+
+
+def load_weights(directory: str, device='cpu') -> Model:
+    """
+    Nacteni modelu ulozeneho funkci save_weights. Na CPU jsou vahy namapovany do pameti a nacitany az pri prvnim
+    pouziti, na ostatnich zarizenich jsou zkopirovany.
+    """
+
+    with open(os.path.join(directory, WEIGHTS_CONFIG)) as f:
+        config = json.load(f)
+
+    # parametry jsou hned nahrazeny namapovanymi vahami, jejich nahodna inicializace by jen zbytecne prosla
+    # celou pamet modelu
+    with _skip_init():
+        model = Model(config['model'], config['ntoken'], config['emsize'], config['nhid'], config['nlayers'], 0,
+                      config['tied'])
+    device = torch.device(device)
+
+    for name, _ in list(model.named_parameters()):
+        if config['tied'] and name == 'decoder.weight':
+            continue
+
+        # copy-on-write mapovani, tensor tedy neni nutne kopirovat a stranky jsou nacteny az pri cteni
+        weights = torch.from_numpy(np.load(os.path.join(directory, name + '.npy'), mmap_mode='c'))
+        module, attribute = model.get_submodule(name.rsplit('.', 1)[0]), name.rsplit('.', 1)[1]
+        setattr(module, attribute, nn.Parameter(weights.to(device), requires_grad=False))
+
+    if config['tied']:
+        model.decoder.weight = model.encoder.weight
+
+    model.eval()
+    model.fingerprint = '{}@{}'.format(os.path.abspath(directory), device)
+    return model
+
+
+@contextmanager
+def _skip_init():
+    """
+    Vytvoreni modelu bez inicializace parametru, parametry jsou pouze alokovany (bez zapisu do pameti).
+    Inicializace je preskocena jen u modulu vytvorenych v aktualnim vlakne, moduly vytvorene soubezne v jinych
+    vlaknech jsou inicializovany normalne.
+    """
+
+    def skip(method):
+        def init(self, *args, **kwargs):
+            if not getattr(_skip_init_state, 'active', False):
+                return method(self, *args, **kwargs)
+
+        return init
+
+    with _skip_init_lock:
+        methods = [(cls, name, cls.__dict__[name]) for cls, name in _INIT_METHODS]
+
+        for cls, name, method in methods:
+            setattr(cls, name, skip(method))
+
+        _skip_init_state.active = True
+        try:
+            yield
+        finally:
+            _skip_init_state.active = False
+
+            for cls, name, method in methods:
+                setattr(cls, name, method)
@@ -0,0 +1,218 @@
+import multiprocessing
+import os
+import time
+import warnings
+
+import torch
+
+"""
+Nastaveni behoveho prostredi inference jazykoveho modelu: pocet vlaken Pytorch (intra-op a inter-op),
+pocet pracovnich procesu a CPU afinita. Nastaveni je spolecne pro cely proces a je aplikovano
+pri vytvoreni analyzatoru a evaluacnich trid, pripadne primo funkci apply.
+"""
+
+
+class RuntimeSettings(object):
+    def __init__(self):
+        # pocet vlaken pro vypocet jedne operace (intra-op), None - vychozi hodnota Pytorch
+        self.threads = None
+        # pocet vlaken pro paralelni beh nezavislych operaci (inter-op)
+        self.interop_threads = None
+        # pocet pracovnich procesu, mezi ktere jsou rozdeleny dokumenty
+        self.workers = 1
+        # seznam CPU, na kterych muze proces bezet, None - bez omezeni
+        self.affinity = None
+
+
+settings = RuntimeSettings()
+_applied = None
+
+
+def configure(threads: int = None, interop_threads: int = None, workers: int = None, affinity: [int] = None) \
+        -> RuntimeSettings:
+    """
+    Nastaveni behoveho prostredi, nepredane hodnoty zustavaji beze zmeny.
+    Nastaveni je aplikovano pri dalsim volani apply.
+    """
+
+    if threads is not None:
+        settings.threads = threads
+
+    if interop_threads is not None:
+        settings.interop_threads = interop_threads
+
+    if workers is not None:
+        settings.workers = workers
+
+    if affinity is not None:
+        settings.affinity = list(affinity)
+
+    return settings
+
+
+def apply():
+    """
+    Aplikace nastaveni na aktualni proces. Opakovane volani bez zmeny nastaveni nic nedela.
+    """
+
+    global _applied
+
+    state = (settings.threads, settings.interop_threads, tuple(settings.affinity or ()))
+    if state == _applied:
+        return
+
+    if settings.affinity:
+        if hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, settings.affinity)
+        else:
+            warnings.warn('CPU affinity is not supported on this platform')
+
+    if settings.threads:
+        torch.set_num_threads(settings.threads)
+
+    if settings.interop_threads and settings.interop_threads != torch.get_num_interop_threads():
+        try:
+            torch.set_num_interop_threads(settings.interop_threads)
+        except RuntimeError as e:
+            # inter-op vlakna lze nastavit pouze pred spustenim prvni paralelni operace
+            warnings.warn('Inter-op threads not set: {}'.format(e))
+
+    _applied = state
+
+
+def available_cpus() -> [int]:
+    """
+    Seznam CPU, na kterych muze aktualni proces bezet
+    """
+
+    if settings.affinity:
+        return list(settings.affinity)
+
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+
+    return list(range(os.cpu_count() or 1))
+
+
+def parse_affinity(text: str) -> [int]:
+    """
+    Prevod textoveho zapisu CPU (napr. '0-3,8,10-11') na seznam
+    """
+
+    cpus = []
+    for part in text.split(','):
+        if '-' in part:
+            start, stop = part.split('-')
+            cpus += list(range(int(start), int(stop) + 1))
+        elif part:
+            cpus.append(int(part))
+
+    return cpus
+
+
+def add_arguments(parser, workers: bool = True):
+    """
+    Pridani argumentu behoveho prostredi do argparse parseru skriptu
+    """
+
+    parser.add_argument('--threads', type=int, help='Number of intra-op threads per process')
+    parser.add_argument('--interop-threads', type=int, help='Number of inter-op threads per process')
+    parser.add_argument('--affinity', type=parse_affinity, help='CPUs to run on, e.g. 0-3,8')
+
+    if workers:
+        parser.add_argument('--workers', type=int, default=1, help='Number of worker processes')
+
+
+def configure_from_args(args) -> RuntimeSettings:
+    """
+    Nastaveni behoveho prostredi z argumentu pridanych funkci add_arguments
+    """
+
+    return configure(args.threads, args.interop_threads, getattr(args, 'workers', None), args.affinity)
+
+
+def _worker_split(workers: int) -> [tuple]:
+    """
+    Rozdeleni dostupnych CPU mezi pracovni procesy, vraci pro kazdy proces dvojici (CPU, pocet vlaken)
+    """
+
+    cpus = available_cpus()
+    size = max(1, len(cpus) // workers)
+    split = []
+
+    for i in range(workers):
+        worker_cpus = cpus[i * size:(i + 1) * size] or cpus
+        split.append((worker_cpus, settings.threads or len(worker_cpus)))
+
+    return split
+
+
+def _init_worker(split, counter):
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+
+    cpus, threads = split[index % len(split)]
+    configure(threads=threads, workers=1, affinity=cpus)
+    apply()
+
+
+def run_workers(function, items: list, workers: int = None) -> list:
+    """
+    Zpracovani polozek funkci function v pracovnich procesech. Kazdy proces dostane vlastni cast CPU
+    a odpovidajici pocet vlaken, aby se procesy vzajemne nezahlcovaly. Pri jednom procesu bezi vse
+    v aktualnim procesu.
+    """
+
+    workers = workers or settings.workers
+
+    if workers <= 1:
+        apply()
+        return [function(item) for item in items]
+
+    # fork - pracovni procesy sdili jiz nacteny model
+    context = multiprocessing.get_context('fork')
+    counter = context.Value('i', 0)
+
+    with context.Pool(workers, initializer=_init_worker, initargs=(_worker_split(workers), counter)) as pool:
+        return pool.map(function, items, chunksize=1)
+
+
+def benchmark(function, items: list, splits: [tuple] = None) -> [tuple]:
+    """
+    Nalezeni nejlepsiho rozdeleni CPU na aktualnim stroji. Pro kazde rozdeleni (pocet procesu, vlaken na proces)
+    zpracuje vsechny polozky a zmeri celkovy cas. Vraci seznam trojic (procesy, vlakna, cas) serazeny od nejrychlejsi.
+    Po mereni je obnoveno puvodni nastaveni i stav procesu (pocet vlaken, CPU afinita).
+    """
+
+    global _applied
+
+    cpus = len(available_cpus())
+
+    if splits is None:
+        splits = [(workers, cpus // workers) for workers in range(1, cpus + 1) if cpus % workers == 0]
+
+    original = (settings.threads, settings.interop_threads, settings.workers, settings.affinity)
+    num_threads = torch.get_num_threads()
+    affinity = os.sched_getaffinity(0) if hasattr(os, 'sched_getaffinity') else None
+    results = []
+
+    try:
+        for workers, threads in splits:
+            configure(threads=threads, workers=workers)
+
+            start_time = time.time()
+            run_workers(function, items, workers)
+            results.append((workers, threads, time.time() - start_time))
+    finally:
+        # obnoveni puvodniho nastaveni, inter-op vlakna mereni nemeni (po spusteni paralelni operace je nelze zmenit)
+        settings.threads, settings.interop_threads, settings.workers, settings.affinity = original
+        torch.set_num_threads(num_threads)
+
+        if affinity is not None and os.sched_getaffinity(0) != affinity:
+            os.sched_setaffinity(0, affinity)
+
+        # puvodni nastaveni je znovu aplikovano pri dalsim volani apply
+        _applied = None
+
+    return sorted(results, key=lambda x: x[2])
@@ -0,0 +1,156 @@
+import queue
+import threading
+import time
+
+from .batch import REQUEST_TYPES, execute
+from .model import Model
+
+"""
+Planovac davek pro soubezne analyzy bezici ve vice vlaknech (napr. pozadavky serveru).
+Pozadavky na model (cteni, odhady, nepodminene pravdepodobnosti) jsou po kratkou dobu sbirany a pozadavky
+stejneho druhu nad stejnym modelem jsou zpracovany jednim volanim modelu. Vsechna volani modelu a zapisy
+do cache tak probihaji v jedinem vlakne planovace.
+"""
+
+# vychozi maximalni pocet sekvenci (cteni, dvojic, prefixu) v jedne davce
+MAX_BATCH = 256
+# vychozi maximalni doba cekani na dalsi pozadavky v sekundach
+MAX_WAIT = 0.005
+
+
+class _Job(object):
+    def __init__(self, model: Model, request_type, requests: list):
+        self.model = model
+        self.request_type = request_type
+        self.requests = requests
+        self.size = sum(len(request) for request in requests)
+        self.results = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class BatchScheduler(object):
+    def __init__(self, max_batch: int = MAX_BATCH, max_wait: float = MAX_WAIT):
+        """
+        max_batch - maximalni pocet sekvenci v davce, po jeho dosazeni je davka zpracovana bez dalsiho cekani,
+            zaroven maximalni pocet sekvenci v jednom pruchodu modelem
+        max_wait - maximalni doba v sekundach, po kterou planovac od prvniho pozadavku ceka na dalsi
+        """
+
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def execute(self, model: Model, request_type, requests: list) -> list:
+        """
+        Zpracovani skupiny pozadavku, viz language_model.batch.execute. Volani blokuje, dokud planovac
+        davku nezpracuje, a vraci vysledky ve stejnem poradi jako requests
+        """
+
+        job = _Job(model, request_type, requests)
+
+        self.start()
+        self._queue.put(job)
+        job.done.wait()
+
+        if job.error is not None:
+            raise job.error
+
+        return job.results
+
+    def start(self):
+        """
+        Spusteni vlakna planovace, pokud jeste nebezi
+        """
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='BatchScheduler', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """
+        Ukonceni vlakna planovace po zpracovani jiz prijatych pozadavku
+        """
+
+        with self._lock:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _loop(self):
+        running = True
+
+        while running:
+            job = self._queue.get()
+
+            if job is None:
+                break
+
+            jobs = [job]
+            size = job.size
+            deadline = time.monotonic() + self.max_wait
+
+            # sber dalsich pozadavku do naplneni davky nebo vyprseni casu
+            while size < self.max_batch:
+                timeout = deadline - time.monotonic()
+
+                if timeout <= 0:
+                    break
+
+                try:
+                    job = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+
+                if job is None:
+                    running = False
+                    break
+
+                jobs.append(job)
+                size += job.size
+
+            self._process(jobs)
+
+    def _process(self, jobs: [_Job]):
+        groups = {}
+
+        for job in jobs:
+            groups.setdefault((id(job.model), job.request_type), []).append(job)
+
+        # stejne poradi druhu pozadavku jako pri zpracovani v jednom vlakne
+        for (_, request_type), group in sorted(groups.items(), key=lambda x: REQUEST_TYPES.index(x[0][1])):
+            try:
+                requests = [r for job in group for r in job.requests]
+                results = execute(group[0].model, request_type, requests, self.max_batch)
+
+                for job in group:
+                    job.results = results[0:len(job.requests)]
+                    results = results[len(job.requests):]
+            except Exception as e:
+                if len(group) == 1:
+                    group[0].error = e
+                else:
+                    # chyba jednoho pozadavku nesmi shodit ostatni analyzy ve skupine, kazdy je zpracovan zvlast
+                    # a chybu dostane jen pozadavek, ktery ji zpusobil
+                    for job in group:
+                        self._process_one(job)
+
+            for job in group:
+                job.done.set()
+
+    def _process_one(self, job: _Job):
+        try:
+            job.results = execute(job.model, job.request_type, job.requests, self.max_batch)
+        except Exception as e:
+            job.error = e
@@ -0,0 +1,98 @@
+import contextlib
+import io
+import json
+import os
+import unittest
+
+import torch
+
+from document import page_xml
+from language_model.analyzer import LmAnalyzer
+from language_model.constants import CS
+from language_model.model import Model
+from language_model.vocabulary import load_vocab
+from spatial.analyzer import ColumnarLmAnalyzer
+
+DIR = os.path.dirname(os.path.realpath(__file__))
+DATA_PATH = os.path.join(DIR, '../../reading_order/metric/tests/data')
+# chain reduction puvodni implementace pro model nize, {stranka-analyza-nastaveni: dvojice}
+EXPECTED_PATH = os.path.join(DIR, 'data', 'analyzer.json')
+
+PAGES = ['5', 'nd_gt']
+SETTINGS = ['hard', 'score', 'soft']
+HARD_LIMIT = 3
+SCORE_LIMIT = 4
+
+docs = {page: page_xml.parse(os.path.join(DATA_PATH, page + '.xml')) for page in PAGES}
+
+with open(EXPECTED_PATH) as f:
+    expected = json.load(f)
+
+
+def chain(reading_order) -> list:
+    return [list(pair) for pair in reading_order.get_chain_reduction()]
+
+
+class TestLmAnalyzer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # maly nahodne inicializovany model se skutecnym slovnikem, vysledky tedy nezavisi na natrenovanem modelu
+        torch.manual_seed(0)
+        cls.model = Model('LSTM', 20000, 16, 16, 2, 0, False).double().eval()
+        cls.vocab = load_vocab(CS, 'train.txt', 20000)
+
+    def _analyzer(self, setting) -> LmAnalyzer:
+        lm = LmAnalyzer(self.model, self.vocab)
+
+        if setting == 'hard':
+            lm.use_hard_limit(HARD_LIMIT)
+        elif setting == 'score':
+            lm.use_score_hard_limit(SCORE_LIMIT)
+        else:
+            lm.set_soft_limit()
+
+        return lm
+
+    def _run(self, analyze):
+        # vypis prubehu analyzy
+        with contextlib.redirect_stdout(io.StringIO()):
+            return analyze()
+
+    def test_analyze(self):
+        for page in PAGES:
+            for setting in SETTINGS:
+                with self.subTest(page=page, setting=setting):
+                    result = self._run(lambda: self._analyzer(setting).analyze(docs[page]))
+                    self.assertEqual(expected['{}-lm-{}'.format(page, setting)], chain(result))
+
+    def test_columnar(self):
+        for page in PAGES:
+            for setting in SETTINGS:
+                with self.subTest(page=page, setting=setting):
+                    lm = self._analyzer(setting)
+                    result = self._run(lambda: ColumnarLmAnalyzer().analyze(docs[page], lm))
+                    self.assertEqual(expected['{}-columnar-{}'.format(page, setting)], chain(result))
+
+    def test_columnar_prefetch(self):
+        for page in PAGES:
+            for setting in SETTINGS:
+                with self.subTest(page=page, setting=setting):
+                    lm = self._analyzer(setting)
+                    result = self._run(lambda: ColumnarLmAnalyzer(prefetch=True).analyze(docs[page], lm))
+                    self.assertEqual(expected['{}-columnar-{}'.format(page, setting)], chain(result))
+
+    def test_analyze_limits(self):
+        for page in PAGES:
+            for setting, limit in [('hard', HARD_LIMIT), ('score', SCORE_LIMIT)]:
+                with self.subTest(page=page, setting=setting):
+                    lm = self._analyzer(setting)
+                    results = self._run(lambda: lm.analyze_limits(docs[page], [limit - 1, limit, limit + 2]))
+                    self.assertEqual(expected['{}-lm-{}'.format(page, setting)], chain(results[limit]))
+
+    def test_analyze_many(self):
+        for setting in SETTINGS:
+            with self.subTest(setting=setting):
+                results = self._run(lambda: self._analyzer(setting).analyze_many([docs[page] for page in PAGES]))
+
+                for page, result in zip(PAGES, results):
+                    self.assertEqual(expected['{}-lm-{}'.format(page, setting)], chain(result))
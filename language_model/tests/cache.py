@@ -0,0 +1,36 @@
+import unittest
+
+import torch
+
+from language_model.cache import PrefixCache
+from language_model.model import Model
+
+
+class TestPrefixCache(unittest.TestCase):
+    def setUp(self):
+        self.model = Model('LSTM', 10, 4, 4, 1, 0, False)
+        self.cache = PrefixCache()
+        self.cache.add(self.model, torch.tensor([1, 2]), 'a')
+        self.cache.add(self.model, torch.tensor([1, 2, 3, 4]), 'b')
+
+    def test_longest(self):
+        self.assertEqual((4, 'b'), self.cache.longest(self.model, torch.tensor([1, 2, 3, 4, 5])))
+        self.assertEqual((4, 'b'), self.cache.longest(self.model, torch.tensor([1, 2, 3, 4])))
+
+    def test_shorter_prefix(self):
+        # sekvence [1, 2, 3] neni ulozena, nejdelsi ulozeny prefix je [1, 2]
+        self.assertEqual((2, 'a'), self.cache.longest(self.model, torch.tensor([1, 2, 3])))
+        self.assertEqual((2, 'a'), self.cache.longest(self.model, torch.tensor([1, 2, 5])))
+
+    def test_no_prefix(self):
+        self.assertEqual((0, None), self.cache.longest(self.model, torch.tensor([1])))
+        self.assertEqual((0, None), self.cache.longest(self.model, torch.tensor([2, 1])))
+        self.assertEqual((0, None), self.cache.longest(self.model, torch.tensor([], dtype=torch.long)))
+
+    def test_models_separated(self):
+        other = Model('LSTM', 10, 4, 4, 1, 0, False)
+        self.assertEqual((0, None), self.cache.longest(other, torch.tensor([1, 2, 3, 4])))
+
+    def test_replace(self):
+        self.cache.add(self.model, torch.tensor([1, 2]), 'c')
+        self.assertEqual((2, 'c'), self.cache.longest(self.model, torch.tensor([1, 2, 3])))
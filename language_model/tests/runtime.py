@@ -0,0 +1,47 @@
+import copy
+import unittest
+
+from language_model import runtime
+
+
+class TestParseAffinity(unittest.TestCase):
+    def test_ranges(self):
+        self.assertEqual([0, 1, 2, 3, 8, 10, 11], runtime.parse_affinity('0-3,8,10-11'))
+
+    def test_single(self):
+        self.assertEqual([5], runtime.parse_affinity('5'))
+
+    def test_empty_parts(self):
+        self.assertEqual([1, 2], runtime.parse_affinity('1,,2,'))
+
+
+class TestWorkerSplit(unittest.TestCase):
+    def setUp(self):
+        # nastaveni je spolecne pro cely proces, po testu je obnoveno
+        self.settings = copy.copy(runtime.settings.__dict__)
+        runtime.settings.threads = None
+        runtime.configure(affinity=[0, 1, 2, 3])
+
+    def tearDown(self):
+        runtime.settings.__dict__.update(self.settings)
+
+    def test_even(self):
+        self.assertEqual([([0, 1], 2), ([2, 3], 2)], runtime._worker_split(2))
+
+    def test_one_worker(self):
+        self.assertEqual([([0, 1, 2, 3], 4)], runtime._worker_split(1))
+
+    def test_threads(self):
+        runtime.configure(threads=1)
+        self.assertEqual([([0, 1], 1), ([2, 3], 1)], runtime._worker_split(2))
+
+    def test_more_workers_than_cpus(self):
+        split = runtime._worker_split(6)
+
+        self.assertEqual(6, len(split))
+        self.assertEqual([[0], [1], [2], [3]], [cpus for cpus, _ in split[0:4]])
+
+        # kazdy proces dostane alespon jedno CPU
+        for cpus, threads in split:
+            self.assertTrue(cpus)
+            self.assertEqual(len(cpus), threads)
@@ -0,0 +1,114 @@
+import threading
+import unittest
+
+import torch
+
+from language_model.batch import EstimateRequest, UnconditionalRequest
+from language_model.cache import DocumentCache
+from language_model.model import Model
+from language_model.scheduler import BatchScheduler, _Job
+from utils.tensor import unpad
+
+
+class TestBatchScheduler(unittest.TestCase):
+    def setUp(self):
+        torch.manual_seed(0)
+        self.model = Model('LSTM', 50, 8, 8, 1, 0, False).double().eval()
+        self.prefixes = [torch.tensor(x) for x in ([3, 4, 5], [6], [7, 8], [9, 10, 11, 12], [13, 14])]
+
+        self.cache = DocumentCache()
+        self.source = torch.tensor([20, 21, 22])
+        self.source_key = self.cache.key(self.model, self.source)
+        self.cache.read(self.model, self.source_key, self.source)
+
+    def _unconditional(self, prefixes):
+        return unpad(*self.model.estimate(prefixes, self.model.read_init()))
+
+    def _assert_probs(self, expected, probs):
+        self.assertEqual(len(expected), len(probs))
+
+        for x, y in zip(expected, probs):
+            self.assertTrue(torch.allclose(x, y))
+
+    def _pairs(self, prefixes):
+        return [(self.source_key, self.cache.key(self.model, x), x, len(x)) for x in prefixes]
+
+    def _unconditional_job(self, prefixes):
+        return _Job(self.model, UnconditionalRequest, [UnconditionalRequest(prefixes)])
+
+    def test_results_in_order(self):
+        jobs = [self._unconditional_job(self.prefixes[0:1]), self._unconditional_job(self.prefixes[1:4]),
+                self._unconditional_job(self.prefixes[4:5])]
+        BatchScheduler()._process(jobs)
+
+        for job in jobs:
+            self.assertIsNone(job.error)
+            self.assertTrue(job.done.is_set())
+            self._assert_probs(self._unconditional(job.requests[0].prefixes), job.results[0])
+
+    def test_grouped_failure(self):
+        good = _Job(self.model, EstimateRequest, [EstimateRequest(self.cache, self._pairs(self.prefixes[0:2]))])
+        # prefix, ktery nebyl precten, odhad dvojice tedy selze
+        missing = self.cache.key(self.model, torch.tensor([30, 31]))
+        bad = _Job(self.model, EstimateRequest, [EstimateRequest(self.cache, [(missing, 0, self.prefixes[2], 2)])])
+        other = _Job(self.model, EstimateRequest, [EstimateRequest(self.cache, self._pairs(self.prefixes[3:5]))])
+
+        BatchScheduler()._process([good, bad, other])
+
+        self.assertIsInstance(bad.error, KeyError)
+        self.assertIsNone(bad.results)
+
+        read = self.cache.read(self.model, self.source_key, self.source)
+        for job, prefixes in [(good, self.prefixes[0:2]), (other, self.prefixes[3:5])]:
+            self.assertIsNone(job.error)
+            self._assert_probs(unpad(*self.model.estimate(prefixes, read)), unpad(*job.results[0]))
+
+        for job in [good, bad, other]:
+            self.assertTrue(job.done.is_set())
+
+    def test_execute_error(self):
+        missing = self.cache.key(self.model, torch.tensor([30, 31]))
+
+        with BatchScheduler() as scheduler:
+            with self.assertRaises(KeyError):
+                scheduler.execute(self.model, EstimateRequest,
+                                  [EstimateRequest(self.cache, [(missing, 0, self.prefixes[0], 3)])])
+
+    def test_concurrent_execute(self):
+        results = {}
+
+        def analyze(i):
+            request = UnconditionalRequest(self.prefixes[i:i + 2])
+            results[i] = scheduler.execute(self.model, UnconditionalRequest, [request])[0]
+
+        with BatchScheduler(max_wait=0.05) as scheduler:
+            threads = [threading.Thread(target=analyze, args=(i,)) for i in range(len(self.prefixes))]
+
+            for thread in threads:
+                thread.start()
+
+            for thread in threads:
+                thread.join()
+
+        for i in range(len(self.prefixes)):
+            self._assert_probs(self._unconditional(self.prefixes[i:i + 2]), results[i])
+
+    def test_stop_drains_queue(self):
+        for max_batch in [1, 256]:
+            with self.subTest(max_batch=max_batch):
+                scheduler = BatchScheduler(max_batch=max_batch, max_wait=1.0)
+                jobs = [self._unconditional_job([x]) for x in self.prefixes]
+
+                # pozadavky cekajici ve fronte pred spustenim planovace
+                for job in jobs:
+                    scheduler._queue.put(job)
+
+                scheduler.start()
+                scheduler.stop()
+
+                self.assertIsNone(scheduler._thread)
+
+                for job in jobs:
+                    self.assertTrue(job.done.is_set())
+                    self.assertIsNone(job.error)
+                    self._assert_probs(self._unconditional(job.requests[0].prefixes), job.results[0])
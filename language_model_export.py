@@ -0,0 +1,32 @@
+import argparse
+
+from language_model.carrier import LANGUAGES, MODEL_NAME, SCRIPTED_MODEL_NAME, WEIGHTS_NAME
+from language_model.constants import get_model_path
+from language_model.model import export_model, load_model, save_weights
+
+"""
+Skript pro export jazykoveho modelu pro inferenci
+script - TorchScript graf (bez dropout, se sloucenym vypoctem skore), nacitany funkcemi cs_scripted_model
+         a de_scripted_model, pripadne load_scripted_model
+weights - vahy bez trenovacich metadat, ktere lze namapovat do pameti, nacitane funkci load_weights,
+          pripadne automaticky funkcemi cs_model a de_model
+"""
+
+parser = argparse.ArgumentParser(description='Language model export')
+parser.add_argument('--model', type=str, default='cs', choices=list(LANGUAGES))
+parser.add_argument('--format', type=str, default='script', choices=['script', 'weights'])
+parser.add_argument('--output', type=str, help='Output path, default next to the model checkpoint')
+
+args = parser.parse_args()
+root = LANGUAGES[args.model]
+# export vzdy z puvodniho checkpointu
+model = load_model(root, MODEL_NAME, 'cpu')
+
+if args.format == 'script':
+    output = args.output or get_model_path(root, SCRIPTED_MODEL_NAME)
+    export_model(model, output)
+else:
+    output = args.output or get_model_path(root, WEIGHTS_NAME)
+    save_weights(model, output)
+
+print('exported: {}'.format(output))
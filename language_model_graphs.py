@@ -38,16 +38,8 @@ def get_matrix_result(eresults, op='mean'):
             correct = 0
 
             for sample in read_samples:
-                # P(kandidat)
-                probs = sample.get_probs()
-
-                if op == 'mean':
-                    # P(kandidat[:T]|prefix) - P(kandidat[:T])
-                    aggregated = [cond_probs[:T].mean() - probs[i][:T].mean() for i, cond_probs in enumerate(sample.get_cond_probs())]
-                elif op == 'sum':
-                    aggregated = [cond_probs[:T].sum() - probs[i][:T].sum() for i, cond_probs in enumerate(sample.get_cond_probs())]
-                else:
-                    raise Exception('Unknown operation')
+                # P(kandidat[:T]|prefix) - P(kandidat[:T])
+                aggregated = sample.aggregate(T, op).tolist()
 
                 key = aggregated.index(max(aggregated))
                 if key == 0:
@@ -64,7 +56,8 @@ def filter_candidates_count(eresults, count):
     ceresults = copy.deepcopy(eresults)
 
     for i, item in enumerate(ceresults.results):
-        item.probabilities = item.probabilities[:count]
+        probs, lengths = item.get_cond_probs()
+        item.probabilities = probs[:count], lengths[:count]
         ceresults.results[i] = item
 
     return ceresults
@@ -11,6 +11,7 @@ import torch.onnx
 import model
 from language_model.content_tokens import load_content_tokens
 from language_model.constants import get_model_path
+from language_model.model import load_model
 from language_model.vocabulary import load_vocab
 
 # --emsize=400 --nhid=1700 --cuda=1 --vocab_size=20000
@@ -59,9 +60,19 @@ parser.add_argument('--continue_training', default=False, action='store_true',
                     help='continue training when model exists')
 parser.add_argument('--vocab_size', default=8000, type=int,
                     help='continue training when model exists')
+parser.add_argument('--teacher', type=str,
+                    help='distillation: name of the teacher model checkpoint in the models folder')
+parser.add_argument('--alpha', type=float, default=0.9,
+                    help='distillation: weight of the teacher loss, the rest is the loss of the true tokens')
+parser.add_argument('--temperature', type=float, default=2.0,
+                    help='distillation: temperature of the teacher and student distributions')
 
 args = parser.parse_args()
 
+if args.teacher and args.model != 'LSTM':
+    # analyza i cache pracuji se skrytymi stavy LSTM (h, c)
+    parser.error('distillation supports only LSTM student')
+
 model_name_parameters = [
     args.model,
     'vocabsize' + str(args.vocab_size),
@@ -73,6 +84,9 @@ model_name_parameters = [
     'seqlen' + str(args.bptt)
 ]
 
+if args.teacher:
+    model_name_parameters.append('distilled')
+
 model_name = '_'.join(model_name_parameters) + '.tar'
 root = os.path.abspath(args.root)
 
@@ -111,6 +125,17 @@ else:
 
 criterion = nn.NLLLoss()
 
+if args.teacher:
+    # ucitel - puvodni (vetsi) model, jehoz rozdeleni nasledujiciho tokenu se student uci
+    teacher = load_model(root, args.teacher, device)
+
+    if teacher.ntoken != ntokens:
+        parser.error('teacher vocabulary size {} does not match --vocab_size'.format(teacher.ntoken))
+
+    print('teacher: {}'.format(args.teacher))
+else:
+    teacher = None
+
 ###############################################################################
 # Load data
 ###############################################################################
@@ -166,6 +191,20 @@ def get_batch(source, i):
     return data.to(device), target.to(device)
 
 
+def distillation_loss(output, targets, teacher_output):
+    """
+    Kombinace KL divergence vuci rozdeleni ucitele a NLL vuci skutecnym tokenum.
+    Obe rozdeleni jsou zmekcena teplotou, gradient KL je proto nasoben jejim ctvercem.
+    """
+
+    t = args.temperature
+    student = nn.functional.log_softmax(output / t, dim=1)
+    teacher = nn.functional.log_softmax(teacher_output / t, dim=1)
+    kl = nn.functional.kl_div(student, teacher, reduction='batchmean', log_target=True)
+
+    return args.alpha * kl * t * t + (1 - args.alpha) * criterion(output, targets)
+
+
 def evaluate(data_source):
     # Turn on evaluation mode which disables dropout.
     model.eval()
@@ -196,6 +235,7 @@ def train():
     start_time = time.time()
 
     hidden = model.init_hidden(args.batch_size)
+    teacher_hidden = teacher.init_hidden(args.batch_size) if teacher else None
 
     for batch, i in enumerate(range(0, train_data.size(0) - 1, args.bptt)):
         data, targets = get_batch(train_data, i)
@@ -204,7 +244,15 @@ def train():
         model.zero_grad()
         hidden = repackage_hidden(hidden)
         output, hidden = model(data, hidden)
-        loss = criterion(output, targets)
+
+        if teacher:
+            # vystup modelu jsou log pravdepodobnosti, pro zmekceni teplotou je lze pouzit misto logitu
+            with torch.no_grad():
+                teacher_output, teacher_hidden = teacher(data, teacher_hidden)
+
+            loss = distillation_loss(output, targets, teacher_output)
+        else:
+            loss = criterion(output, targets)
         loss.backward()
 
         # `clip_grad_norm` helps prevent the exploding gradient problem in RNNs / LSTMs.
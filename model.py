@@ -1,3 +1,4 @@
+import torch
 import torch.nn as nn
 import torch.nn.functional as F
 
@@ -44,7 +45,7 @@ class RNNModel(nn.Module):
         emb = self.drop(self.encoder(input))
         output, hidden = self.rnn(emb, hidden)
         output = self.drop(output)
-        decoded = self.decoder(output)
+        decoded = self._decode(output)
         if not default:
             # pro ucely vyhodnoceni, kdy je zadouci vratit pro kazdy batch jeho pravdepodobnosti
             return F.log_softmax(decoded, dim=2), hidden
@@ -52,6 +53,51 @@ class RNNModel(nn.Module):
         decoded = decoded.view(-1, self.ntoken)
         return F.log_softmax(decoded, dim=1), hidden
 
+    def score_packed(self, input, hidden, targets):
+        """
+        Vraci pouze log pravdepodobnosti cilovych tokenu (targets) sekvenci ruzne delky zabalenych
+        do PackedSequence, model tedy nepocita pozice paddingu. Normalizace je spoctena primo z vystupu dekoderu,
+        neni tedy vytvaren tensor log_softmax nad celym slovnikem.
+        targets - cilove tokeny v poradi input.data, skore jsou vracena ve stejnem poradi.
+        """
+
+        emb = self.drop(self.encoder(input.data))
+        output, hidden = self.rnn(input._replace(data=emb), hidden)
+        output = self.drop(output.data)
+        decoded = self._decode(output)
+        normalizer = torch.logsumexp(decoded, dim=1)
+        return decoded.gather(1, targets.unsqueeze(1)).squeeze(1) - normalizer, hidden
+
+    def forward_last(self, input, hidden):
+        """
+        Vraci log pravdepodobnosti pouze pro posledni pozici kazdeho batche, dekoder tedy
+        nezpracovava vystupy vsech tokenu vstupni sekvence.
+        """
+
+        emb = self.drop(self.encoder(input))
+        output, hidden = self.rnn(emb, hidden)
+        output = self.drop(output[-1])
+        decoded = self._decode(output)
+        return F.log_softmax(decoded, dim=1), hidden
+
+    def forward_last_packed(self, input, hidden):
+        """
+        Varianta metody forward_last pro sekvence ruzne delky zabalene do PackedSequence. Posledni vystup
+        LSTM kazde sekvence (na jeji skutecne delce) je roven skryte vrstve h posledni vrstvy site,
+        dekodovany jsou tedy pouze tyto vystupy. Vraci log pravdepodobnosti ve stejnem poradi jako sekvence.
+        """
+
+        emb = self.drop(self.encoder(input.data))
+        _, hidden = self.rnn(input._replace(data=emb), hidden)
+        output = self.drop(hidden[0][-1])
+        decoded = self._decode(output)
+        return F.log_softmax(decoded, dim=1), hidden
+
+    def _decode(self, output):
+        # dekoder muze bezet ve snizene presnosti (bf16), normalizace log pravdepodobnosti je ale pocitana ve fp32
+        decoded = self.decoder(output)
+        return decoded.float() if decoded.dtype in (torch.bfloat16, torch.float16) else decoded
+
     def init_hidden(self, bsz):
         weight = next(self.parameters())
         return (weight.new_zeros(self.nlayers, bsz, self.nhid),
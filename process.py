@@ -3,18 +3,12 @@ import os
 import sys
 
 from document import page_xml
-from language_model.analyzer import LmAnalyzer
-from language_model.carrier import cs_model, cs_vocab, de_model, de_vocab
+from language_model import runtime
 from reading_order.metric.recall import compare as dp_compare
 from reading_order.metric.prima import compare as prima_compare
-from spatial.analyzer import DiagonalAnalyzer, ColumnarAnalyzer, ColumnarLmAnalyzer, \
-    TopToBottomAnalyzer
+from service.analysis import ALLOWED_METHODS, ALLOWED_MODELS, ALLOWED_PRECISIONS, analyze
 from spatial.plotter import Plotter
 
-ALLOWED_METHODS = ['LH', 'LS', 'SD', 'SC', 'CH', 'CS', 'TB']
-TOKENS_REQUIRED_METHODS = ['L', 'C']
-ALLOWED_MODELS = ['cs', 'de']
-
 parser = argparse.ArgumentParser(description="""\
 Script for analyse PageXML file to identify reading order of document.
 """, formatter_class=argparse.RawTextHelpFormatter)
@@ -37,8 +31,20 @@ Model used by language analyse or combined analyze
 cs - 'Czech language model'
 de - 'German language model'
 """)
+parser.add_argument('--quantize', '-q', action='store_true',
+                    help='Use int8 dynamic quantized language model, CPU only')
+# int8 je zvolena prepinacem --quantize
+parser.add_argument('--precision', '-p', default='fp32',
+                    choices=[precision for precision in ALLOWED_PRECISIONS if precision != 'int8'],
+                    help='Precision of language model weights, bf16 keeps log-probabilities in fp32')
+parser.add_argument('--scripted', '-s', action='store_true',
+                    help='Use language model exported by language_model_export.py')
+parser.add_argument('--prefetch', action='store_true',
+                    help='Combined analyse, estimate queries of all columns in one batch before reconnecting')
+runtime.add_arguments(parser, workers=False)
 
 args = parser.parse_args()
+runtime.configure_from_args(args)
 path = os.path.abspath(args.path)
 
 if not os.path.isfile(path):
@@ -55,37 +61,14 @@ if args.model not in ALLOWED_MODELS:
     print('Unknown model {}'.format(args.method), file=sys.stderr)
     exit(1)
 
-if args.method[1] in ['H', 'S']:
-    if args.model == 'cs':
-        model, vocab = cs_model(), cs_vocab()
-    else:
-        model, vocab = de_model(), de_vocab()
-
-    lm_analyzer = LmAnalyzer(model, vocab)
-
-    if args.method[1] == 'H':
-        lm_analyzer.use_hard_limit(args.tokens)
-    else:
-        lm_analyzer.use_score_hard_limit(args.tokens)
-
-    if args.method[0] == 'L':
-        ro = lm_analyzer.analyze(doc)
-    elif args.method[0] == 'C':
-        analyzer = ColumnarLmAnalyzer()
-        ro = analyzer.analyze(doc, lm_analyzer)
-elif args.method == 'SD':
-    analyzer = DiagonalAnalyzer()
-    ro = analyzer.analyze(doc)
-elif args.method == 'SC':
-    analyzer = ColumnarAnalyzer()
-    ro = analyzer.analyze(doc)
-elif args.method == 'TB':
-    analyzer = TopToBottomAnalyzer()
-    ro = analyzer.analyze(doc)
-else:
-    print('Method not recognized', file=sys.stderr)
+if args.scripted and (args.quantize or args.precision != 'fp32'):
+    print('Scripted model keeps the precision it was exported with, --quantize and --precision can not be used',
+          file=sys.stderr)
     exit(1)
 
+ro = analyze(doc, args.method, args.model, args.tokens, 'int8' if args.quantize else args.precision, args.scripted,
+             prefetch=args.prefetch)
+
 plotter = Plotter(doc)
 plotter.plot_document_border()
 plotter.plot_all_regions()
@@ -0,0 +1,51 @@
+import argparse
+import os
+
+from document.page_xml import parse
+from language_model import runtime
+from language_model.analyzer import LmAnalyzer
+from language_model.carrier import cs_model, cs_vocab, de_model, de_vocab
+
+"""
+Skript pro nalezeni nejlepsiho rozdeleni CPU (pocet pracovnich procesu a vlaken na proces) pro jazykovou
+analyzu na aktualnim stroji. Nalezene hodnoty lze predat skriptum process.py a reading_order_eval.py
+argumenty --threads a --workers.
+--path je cesta do slozky s xml dokumenty, pripadne na konkretni xml soubor
+"""
+
+parser = argparse.ArgumentParser(description='Runtime benchmark')
+parser.add_argument('--path', type=str, required=True)
+parser.add_argument('--model', type=str, default='cs', choices=['cs', 'de'])
+parser.add_argument('--tokens', type=int, default=3, help='Hard token limit of language analyse')
+parser.add_argument('--affinity', type=runtime.parse_affinity, help='CPUs to run on, e.g. 0-3,8')
+
+args = parser.parse_args()
+path = os.path.abspath(args.path)
+runtime.configure(affinity=args.affinity)
+
+if os.path.isfile(path):
+    files = [path]
+else:
+    files = [os.path.join(path, x) for x in sorted(os.listdir(path)) if x.endswith('.xml')]
+
+if not files:
+    print('Not files specified')
+    exit()
+
+model, vocab = (cs_model(), cs_vocab()) if args.model == 'cs' else (de_model(), de_vocab())
+
+
+def analyze(file):
+    analyzer = LmAnalyzer(model, vocab)
+    analyzer.use_hard_limit(args.tokens)
+    analyzer.analyze(parse(file))
+
+
+results = runtime.benchmark(analyze, files)
+
+print('| {:>7} | {:>7} | {:>9} |'.format('workers', 'threads', 'time [s]'))
+for workers, threads, elapsed in results:
+    print('| {:7} | {:7} | {:9.2f} |'.format(workers, threads, elapsed))
+
+workers, threads, _ = results[0]
+print('best: --workers {} --threads {}'.format(workers, threads))
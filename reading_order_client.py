@@ -0,0 +1,43 @@
+import argparse
+import json
+import sys
+
+from service.client import Client, AnalysisError
+
+"""
+Klient serveru reading_order_server.py, nahrazuje volani process.py pro jednu stranku.
+Vypise posloupnost cteni, kazdou usporadanou skupinu na jeden radek, pripadne cely vysledek v json.
+"""
+
+parser = argparse.ArgumentParser(description='Reading order analysis client')
+parser.add_argument('path', type=str, help='Path to PageXML file which will be analysed')
+parser.add_argument('method', type=str, help='Method for analyse, see process.py --help')
+parser.add_argument('--tokens', '-t', type=int, default=3, help='Number of tokens, using for L and C analyse')
+parser.add_argument('--model', '-m', type=str, default='cs', help='Language model, cs or de')
+parser.add_argument('--precision', '-p', type=str, help='Precision of language model, default of server is used')
+parser.add_argument('--send', action='store_true', help='Send file content instead of path, for remote file systems')
+parser.add_argument('--json', action='store_true', help='Print whole result as json')
+parser.add_argument('--host', type=str, default='127.0.0.1')
+parser.add_argument('--port', type=int, default=8765)
+parser.add_argument('--socket', type=str, help='Path to Unix socket of server')
+
+args = parser.parse_args()
+client = Client(args.host, args.port, args.socket)
+
+try:
+    if args.send:
+        with open(args.path, 'rb') as file:
+            result = client.analyze(data=file.read(), method=args.method, model=args.model, tokens=args.tokens,
+                                    precision=args.precision)
+    else:
+        result = client.analyze(args.path, method=args.method, model=args.model, tokens=args.tokens,
+                                precision=args.precision)
+except (AnalysisError, OSError) as e:
+    print(e, file=sys.stderr)
+    exit(1)
+
+if args.json:
+    print(json.dumps(result))
+else:
+    for group in result['groups']:
+        print(' '.join(group))
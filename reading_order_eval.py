@@ -5,8 +5,10 @@ import pickle
 import torch
 
 from document.page_xml import parse
+from language_model import runtime
 from language_model.carrier import de_model, de_vocab, cs_model, cs_vocab
 from language_model.analyzer import LmAnalyzer as LmAnalyzer
+from language_model.cache import DocumentCache
 from spatial.analyzer import DiagonalAnalyzer, ColumnarAnalyzer, ColumnarLmAnalyzer
 
 """
@@ -18,20 +20,21 @@ Vysledky jsou serializovany a ulozeny do pkl souboru
 
 parser = argparse.ArgumentParser(description='')
 parser.add_argument('--path', type=str, required=True)
+parser.add_argument('--quantize', action='store_true', help='Use int8 dynamic quantized language model, CPU only')
+runtime.add_arguments(parser)
 
-device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
 args = parser.parse_args()
+runtime.configure_from_args(args)
+# pracovni procesy bezi pouze na CPU
+device = torch.device("cpu" if args.quantize or args.workers > 1 or not torch.cuda.is_available() else "cuda:0")
 path = os.path.abspath(args.path)
 
-model = cs_model(device)
+model = cs_model(device, args.quantize)
 vocab = cs_vocab()
 
 # model = de_model(device)
 # vocab = de_vocab()
 
-errors = []
-
-
 def save(dir, file, content: dict):
     filename = file.replace('.xml', '') + '.pkl'
     with open(os.path.join(dir, filename), 'wb') as f:
@@ -55,19 +58,23 @@ if not files:
     print('Not files specified')
     exit()
 
-for i, file in enumerate(sorted(files, reverse=True)):
+
+def evaluate(item):
+    i, file = item
     print("{}: {}".format(i, file))
 
     try:
         filepath = os.path.join(dir, file)
 
         if os.path.isfile(filepath.replace('xml', 'pkl')):
-            continue
+            return None
 
         doc = parse(filepath)
 
         lmAnalyzer = LmAnalyzer(model, vocab)
         lmAnalyzer.process_print = True
+        # skryte stavy a odhady jsou sdileny mezi vsemi konfiguracemi analyzy dokumentu
+        lmAnalyzer.use_cache(DocumentCache())
 
         diagonalAnalyzer = DiagonalAnalyzer()
         columnarAnalyzer = ColumnarAnalyzer()
@@ -75,25 +82,16 @@ for i, file in enumerate(sorted(files, reverse=True)):
 
         results = {}
 
-        print('lm-h-2')
+        # vsechny limity jednoho typu analyzy jsou odhadnuty jednim pruchodem s maximalnim limitem
+        print('lm-h-2, lm-h-3')
         lmAnalyzer.use_hard_limit(2)
-        results['lm-H-2'] = lmAnalyzer.analyze(doc)
-
-        print('lm-h-3')
-        lmAnalyzer.use_hard_limit(3)
-        results['lm-H-3'] = lmAnalyzer.analyze(doc)
+        for limit, ro in lmAnalyzer.analyze_limits(doc, [2, 3]).items():
+            results['lm-H-{}'.format(limit)] = ro
 
-        print('lm-s-4')
+        print('lm-s-4, lm-s-5, lm-s-6')
         lmAnalyzer.use_score_hard_limit(4)
-        results['lm-S-4'] = lmAnalyzer.analyze(doc)
-
-        print('lm-s-5')
-        lmAnalyzer.use_score_hard_limit(5)
-        results['lm-S-5'] = lmAnalyzer.analyze(doc)
-
-        print('lm-s-6')
-        lmAnalyzer.use_score_hard_limit(6)
-        results['lm-S-6'] = lmAnalyzer.analyze(doc)
+        for limit, ro in lmAnalyzer.analyze_limits(doc, [4, 5, 6]).items():
+            results['lm-S-{}'.format(limit)] = ro
 
         results['diag'] = diagonalAnalyzer.analyze(doc)
         results['col'] = columnarAnalyzer.analyze(doc)
@@ -119,9 +117,13 @@ for i, file in enumerate(sorted(files, reverse=True)):
         raise e
         s = str(e)
         err = "{} - {}".format(file, s)
-        errors.append(err)
         print(err)
+        return err
+
 
+# dokumenty jsou pripadne rozdeleny mezi vice pracovnich procesu, viz language_model.runtime
+errors = runtime.run_workers(evaluate, list(enumerate(sorted(files, reverse=True))))
+errors = [err for err in errors if err]
 
 for err in errors:
     print(err)
@@ -0,0 +1,109 @@
+import argparse
+import os
+import time
+from statistics import mean
+
+from document.page_xml import parse
+from language_model.analyzer import LmAnalyzer
+from language_model.carrier import cs_model, cs_vocab, de_model, de_vocab
+from language_model.constants import CS, DE
+from language_model.model import load_model, quantize_model, convert_precision
+from reading_order.metric.prima import compare as prima_compare
+from reading_order.metric.recall import compare as dp_compare
+
+"""
+Skript pro porovnani puvodniho jazykoveho modelu (fp32) s jeho zrychlenymi variantami na CPU:
+kvantizovanym modelem (--quantize), modelem v bf16 (--bf16) a destilovanym studentem (--student,
+viz language_model_train.py --teacher)
+--path je cesta do slozky s xml dokumenty s ground truth, pripadne na konkretni xml soubor
+
+Pro kazdou metodu a model vypise prumernou dobu analyzy dokumentu, recall a procento penalizace Prima.
+Pokud se recall nebo Prima nektere varianty lisi od fp32 o vice nez --tolerance procentnich bodu,
+skript skonci s chybou, lze jej tedy pouzit jako regresni kontrolu presnosti.
+"""
+
+METHODS = {
+    'lm-H-3': lambda analyzer: analyzer.use_hard_limit(3),
+    'lm-S-5': lambda analyzer: analyzer.use_score_hard_limit(5),
+}
+
+parser = argparse.ArgumentParser(description='Language model report')
+parser.add_argument('--path', type=str, required=True)
+parser.add_argument('--model', type=str, default='cs', choices=['cs', 'de'])
+parser.add_argument('--quantize', action='store_true', help='Compare int8 quantized model')
+parser.add_argument('--bf16', action='store_true', help='Compare bf16 model')
+parser.add_argument('--tolerance', type=float, default=1.0,
+                    help='Maximal allowed difference of recall and Prima of every compared model against fp32 '
+                         'in percentage points')
+parser.add_argument('--student', type=str, help='Compare distilled model, name of the checkpoint in the models folder')
+
+args = parser.parse_args()
+path = os.path.abspath(args.path)
+
+if os.path.isfile(path):
+    files = [path]
+else:
+    files = [os.path.join(path, x) for x in sorted(os.listdir(path)) if x.endswith('.xml')]
+
+if not files:
+    print('Not files specified')
+    exit()
+
+model, vocab = (cs_model('cpu'), cs_vocab()) if args.model == 'cs' else (de_model('cpu'), de_vocab())
+models = {'fp32': model}
+
+if args.quantize:
+    models['int8'] = quantize_model(model)
+
+if args.bf16:
+    models['bf16'] = convert_precision(model, 'bf16')
+
+if args.student:
+    models['student'] = load_model(CS if args.model == 'cs' else DE, args.student, 'cpu')
+
+results = {}
+
+for file in files:
+    doc = parse(file)
+    ground_truth = doc.get_reading_order()
+
+    if not ground_truth:
+        print('Ground truth is not in file {}'.format(file))
+        continue
+
+    print(os.path.basename(file))
+
+    for name, model in models.items():
+        analyzer = LmAnalyzer(model, vocab)
+
+        for method, settings in METHODS.items():
+            settings(analyzer)
+
+            start_time = time.time()
+            ro = analyzer.analyze(doc)
+            elapsed = time.time() - start_time
+
+            result = results.setdefault((method, name), {'time': [], 'recall': [], 'prima': []})
+            result['time'].append(elapsed)
+            result['recall'].append(dp_compare(ground_truth, ro).recall())
+            result['prima'].append(prima_compare(doc, ground_truth, ro).percentage())
+
+print('| {:8} | {:9} | {:>9} | {:>9} | {:>9} |'.format('method', 'model', 'time [s]', 'recall', 'prima'))
+for (method, name), result in results.items():
+    print('| {:8} | {:9} | {:9.3f} | {:9.2f} | {:9.2f} |'.format(
+        method, name, *[mean(result[x]) for x in ['time', 'recall', 'prima']]))
+
+# regresni kontrola presnosti vuci fp32
+failed = False
+for (method, name), result in results.items():
+    reference = results[(method, 'fp32')]
+
+    for metric in ['recall', 'prima']:
+        difference = abs(mean(result[metric]) - mean(reference[metric]))
+
+        if difference > args.tolerance:
+            print('FAIL {} {} {}: difference {:.2f}'.format(method, name, metric, difference))
+            failed = True
+
+if failed:
+    exit(1)
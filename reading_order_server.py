@@ -0,0 +1,40 @@
+import argparse
+
+from language_model import runtime
+from language_model.scheduler import MAX_BATCH, MAX_WAIT
+from service.analysis import ALLOWED_MODELS, ALLOWED_PRECISIONS
+from service.server import create_server, warmup, serve
+
+"""
+Spusteni serveru pro analyzu posloupnosti cteni, modely zustavaji nactene mezi pozadavky.
+Klientem je skript reading_order_client.py, pripadne trida service.client.Client
+"""
+
+parser = argparse.ArgumentParser(description='Reading order analysis server')
+parser.add_argument('--host', type=str, default='127.0.0.1', help='Address to listen on')
+parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+parser.add_argument('--socket', type=str, help='Path to Unix socket, used instead of host and port')
+parser.add_argument('--models', type=str, default='cs', help='Comma separated models loaded at start, e.g. cs,de')
+parser.add_argument('--precision', default='fp32', choices=ALLOWED_PRECISIONS,
+                    help='Default precision of language models')
+parser.add_argument('--batch-size', type=int, default=MAX_BATCH,
+                    help='Maximal number of sequences in one batch of language model')
+parser.add_argument('--max-wait', type=float, default=MAX_WAIT * 1000,
+                    help='Maximal time in milliseconds to wait for other requests before running a batch')
+parser.add_argument('--verbose', '-v', action='store_true', help='Log requests and language model analysis progress')
+runtime.add_arguments(parser, workers=False)
+
+args = parser.parse_args()
+runtime.configure_from_args(args)
+
+models = [model for model in args.models.split(',') if model]
+for model in models:
+    if model not in ALLOWED_MODELS:
+        parser.error('Unknown model {}'.format(model))
+
+server = create_server(args.host, args.port, args.socket, args.precision, args.verbose, args.batch_size,
+                       args.max_wait / 1000)
+warmup(server, models, args.precision)
+
+print('Listening on {}'.format(args.socket or '{}:{}'.format(args.host, args.port)), flush=True)
+serve(server)
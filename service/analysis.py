@@ -0,0 +1,100 @@
+from document.stubs import Document as StubDocument
+from language_model.analyzer import LmAnalyzer
+from language_model.carrier import get_model, get_vocab, PRECISIONS
+from language_model.scheduler import BatchScheduler
+from reading_order.reading_order import ReadingOrder
+from spatial.analyzer import DiagonalAnalyzer, ColumnarAnalyzer, ColumnarLmAnalyzer, TopToBottomAnalyzer
+
+"""
+Spolecne spusteni analyzy posloupnosti cteni dle zvolene metody, vyuzite skriptem process.py i serverem.
+Modely a slovniky jsou sdilene instance z language_model.carrier, v ramci jednoho procesu se tedy nacitaji jen jednou.
+"""
+
+ALLOWED_METHODS = ['LH', 'LS', 'SD', 'SC', 'CH', 'CS', 'TB']
+TOKENS_REQUIRED_METHODS = ['L', 'C']
+ALLOWED_MODELS = ['cs', 'de']
+ALLOWED_PRECISIONS = PRECISIONS
+
+
+def language_model(language: str = 'cs', precision: str = 'fp32', scripted: bool = False):
+    """
+    Vraci sdilenou instanci jazykoveho modelu pro analyzu, viz language_model.carrier.get_model
+    """
+
+    return get_model(language, 'cpu', precision, scripted)
+
+
+def create_lm_analyzer(method: str, language: str = 'cs', tokens: int = 3, precision: str = 'fp32',
+                       scripted: bool = False, scheduler: BatchScheduler = None, verbose: bool = True) -> LmAnalyzer:
+    """
+    Vytvoreni jazykoveho analyzatoru pro metody L a C
+    verbose - vypis prubehu analyzy na standardni vystup
+    """
+
+    lm_analyzer = LmAnalyzer(language_model(language, precision, scripted), get_vocab(language))
+    lm_analyzer.use_scheduler(scheduler)
+    lm_analyzer.set_verbose(verbose)
+
+    if method[1] == 'H':
+        lm_analyzer.use_hard_limit(tokens)
+    else:
+        lm_analyzer.use_score_hard_limit(tokens)
+
+    return lm_analyzer
+
+
+def analyze(doc: StubDocument, method: str, language: str = 'cs', tokens: int = 3, precision: str = 'fp32',
+            scripted: bool = False, scheduler: BatchScheduler = None, prefetch: bool = False,
+            verbose: bool = True) -> ReadingOrder:
+    """
+    Analyza dokumentu zvolenou metodou, viz ALLOWED_METHODS
+    scheduler - planovac davek pro soubezne analyzy ve vice vlaknech
+    prefetch - u kombinovane analyzy odhad dotazu vsech sloupcu predem, viz ColumnarLmAnalyzer
+    verbose - vypis prubehu jazykove analyzy na standardni vystup
+    """
+
+    if method not in ALLOWED_METHODS:
+        raise ValueError('Unknown method {}'.format(method))
+
+    if language not in ALLOWED_MODELS:
+        raise ValueError('Unknown model {}'.format(language))
+
+    if precision not in ALLOWED_PRECISIONS:
+        raise ValueError('Unknown precision {}'.format(precision))
+
+    if method[0] in TOKENS_REQUIRED_METHODS:
+        lm_analyzer = create_lm_analyzer(method, language, tokens, precision, scripted, scheduler, verbose)
+
+        if method[0] == 'L':
+            return lm_analyzer.analyze(doc)
+
+        return ColumnarLmAnalyzer(prefetch).analyze(doc, lm_analyzer)
+
+    if method == 'SD':
+        return DiagonalAnalyzer().analyze(doc)
+
+    if method == 'SC':
+        return ColumnarAnalyzer().analyze(doc)
+
+    return TopToBottomAnalyzer().analyze(doc)
+
+
+def to_dict(ro: ReadingOrder) -> dict:
+    """
+    Prevod posloupnosti cteni na slovnik serializovatelny do json.
+    groups - usporadane skupiny jako seznamy id regionu v poradi cteni
+    chain - dvojice (predchudce, naslednik), viz ReadingOrder.get_chain_reduction
+    """
+
+    groups = []
+    for group in ro.get_ordered_groups():
+        for item in group.get_beginnings():
+            ids = []
+
+            while item:
+                ids.append(item.get_id())
+                item = item.get_successor()
+
+            groups.append(ids)
+
+    return {'groups': groups, 'chain': [list(pair) for pair in ro.get_chain_reduction()]}
@@ -0,0 +1,88 @@
+import http.client
+import json
+import os
+import socket
+from urllib.parse import urlencode
+
+"""
+Tenky klient serveru service.server. Importuje pouze standardni knihovnu, volani je tedy levne
+i z kratce bezicich procesu (napr. zpracovani jedne stranky).
+"""
+
+
+class AnalysisError(Exception):
+    ...
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """
+    HTTP spojeni pres Unix socket
+    """
+
+    def __init__(self, path: str, timeout: float = None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+
+        self.sock.connect(self.socket_path)
+
+
+class Client(object):
+    def __init__(self, host: str = '127.0.0.1', port: int = 8765, socket: str = None, timeout: float = None):
+        self.host = host
+        self.port = port
+        self.socket = socket
+        self.timeout = timeout
+
+    def analyze(self, path: str = None, data: bytes = None, method: str = 'CS', model: str = 'cs', tokens: int = 3,
+                precision: str = None) -> dict:
+        """
+        Analyza dokumentu na serveru. Dokument je predan cestou (path), kterou server cte sam,
+        nebo obsahem PageXML (data). Vraci slovnik s posloupnosti cteni, viz service.analysis.to_dict
+        """
+
+        query = {'method': method, 'model': model, 'tokens': tokens}
+
+        if precision:
+            query['precision'] = precision
+
+        if path is not None:
+            query['path'] = os.path.abspath(path)
+            data = b''
+
+        return self._request('POST', '/analyze?' + urlencode(query), data)
+
+    def health(self) -> dict:
+        return self._request('GET', '/health')
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self.socket:
+            return UnixHTTPConnection(self.socket, self.timeout)
+
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _request(self, method: str, url: str, body: bytes = None) -> dict:
+        connection = self._connection()
+
+        try:
+            connection.request(method, url, body, {'Content-Type': 'application/xml'})
+            response = connection.getresponse()
+            body = response.read()
+        finally:
+            connection.close()
+
+        try:
+            result = json.loads(body.decode('utf-8'))
+        except ValueError:
+            # odpoved jineho serveru nebo proxy, pripadne preruseny vystup
+            raise AnalysisError('Response with status {} is not json: {!r}'.format(response.status, body[0:200]))
+
+        if response.status != 200:
+            raise AnalysisError(result.get('error', 'Request failed with status {}'.format(response.status)))
+
+        return result
@@ -0,0 +1,159 @@
+import json
+import os
+import socketserver
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from document.page_xml import parse_bytes, InvalidPageXML
+from language_model import runtime
+from language_model.carrier import get_model, get_vocab
+from language_model.scheduler import BatchScheduler, MAX_BATCH, MAX_WAIT
+from .analysis import analyze, to_dict
+
+"""
+Dlouhobezici server pro analyzu posloupnosti cteni. Modely, slovniky a cache zustavaji nactene mezi pozadavky,
+jedna analyza tedy neplati import Pytorch ani nacteni modelu. Server posloucha na lokalni HTTP adrese,
+pripadne na Unix socketu. Pozadavky jsou zpracovany soubezne, volani modelu vsech rozpracovanych analyz
+spojuje do davek planovac (viz language_model.scheduler).
+
+POST /analyze?method=CS&model=cs&tokens=3&precision=fp32[&path=/cesta/k/souboru.xml]
+    telo pozadavku obsahuje PageXML, pokud neni predan parametr path
+    vraci json {'groups': [[id, ...]], 'chain': [[id, id]], 'time': doba analyzy}
+GET /health
+    vraci json {'status': 'ok', 'models': [nactene modely]}
+
+Chybny pozadavek vraci 400, chyba analyzy 500, oboji s json {'error': popis chyby}
+"""
+
+
+class AnalysisHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if urlparse(self.path).path != '/health':
+            self._send_json(404, {'error': 'Not found'})
+            return
+
+        self._send_json(200, {'status': 'ok', 'models': self.server.models})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+
+        if url.path != '/analyze':
+            self._send_json(404, {'error': 'Not found'})
+            return
+
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length', 0))
+        data = self.rfile.read(length) if length else b''
+
+        try:
+            if 'path' in query:
+                with open(query['path'], 'rb') as file:
+                    data = file.read()
+
+            doc = parse_bytes(data)
+            method = query.get('method', 'CS')
+            tokens = int(query.get('tokens', 3))
+            language = query.get('model', 'cs')
+            precision = query.get('precision', self.server.precision)
+
+            # prubeh analyzy je vypisovan jen s --verbose, jinak by vystup serveru zahltil
+            start_time = time.time()
+            ro = analyze(doc, method, language, tokens, precision, scheduler=self.server.scheduler,
+                         verbose=self.server.verbose)
+            elapsed = time.time() - start_time
+
+            result = to_dict(ro)
+            result['time'] = elapsed
+        except (InvalidPageXML, ValueError, OSError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        except Exception as e:
+            # chyba analyzy nesmi ukoncit spojeni bez odpovedi, klient dostane popis chyby
+            self.log_error('Analysis failed: %r', e)
+            self._send_json(500, {'error': '{}: {}'.format(type(e).__name__, e)})
+            return
+
+        self._send_json(200, result)
+
+    def address_string(self):
+        # u Unix socketu neni adresa klienta dvojice (host, port)
+        if isinstance(self.client_address, tuple):
+            return super().address_string()
+
+        return 'unix'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, data: dict):
+        body = json.dumps(data).encode('utf-8')
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        # socket po predchozim behu serveru
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+        super().server_bind()
+
+
+def create_server(host: str = '127.0.0.1', port: int = 8765, socket: str = None, precision: str = 'fp32',
+                  verbose: bool = False, max_batch: int = MAX_BATCH, max_wait: float = MAX_WAIT):
+    """
+    Vytvoreni serveru na HTTP adrese nebo na Unix socketu (socket - cesta k souboru socketu)
+    max_batch, max_wait - nastaveni planovace davek, viz BatchScheduler
+    """
+
+    if socket:
+        server = UnixHTTPServer(socket, AnalysisHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), AnalysisHandler)
+
+    server.precision = precision
+    server.verbose = verbose
+    server.models = []
+    server.scheduler = BatchScheduler(max_batch, max_wait)
+
+    return server
+
+
+def warmup(server, languages: [str], precision: str = 'fp32'):
+    """
+    Nacteni modelu a slovniku predem, aby prvni pozadavek necekal na jejich nacteni
+    """
+
+    runtime.apply()
+
+    for language in languages:
+        get_model(language, 'cpu', precision)
+        get_vocab(language)
+        server.models.append('{}-{}'.format(language, precision))
+
+
+def serve(server):
+    """
+    Spusteni serveru, bezi do preruseni procesu
+    """
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.scheduler.stop()
+
+        if isinstance(server, UnixHTTPServer) and os.path.exists(server.server_address):
+            os.remove(server.server_address)
+
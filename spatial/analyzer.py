@@ -1,4 +1,5 @@
 from document.stubs import Document as StubDocument, TextRegion as StubTextRegion
+from language_model import runtime
 from language_model.analyzer import LmAnalyzer as LmAnalyzer
 from reading_order.reading_order import ReadingOrder
 from spatial.spatial_data import DocTBRR, get_neighborhood, get_headers, STARTS, ISTARTS, DURING, FINISHES, OVERLAPS, \
@@ -140,14 +141,18 @@ class ColumnarLmAnalyzer():
     TWO_CANDIDATES = 0.85
     THREE_CANDIDATES = 0.6
 
-    def __init__(self):
+    def __init__(self, prefetch: bool = False):
         self.tbrr = None
         self.r = None
         self.neighborhood = None
         self.doc = None
         self.headers = None
+        # predem odhadnout dvojice (sloupec, kandidat) vsech sloupcu jednim davkovym pruchodem modelu
+        self.prefetch = prefetch
 
     def analyze(self, doc: StubDocument, lm_analyzer: LmAnalyzer) -> ReadingOrder:
+        runtime.apply()
+
         # nacteni sloupcoveho analyzatoru
         columnar_analyzer = ColumnarAnalyzer()
 
@@ -160,6 +165,9 @@ class ColumnarLmAnalyzer():
         self.doc = doc
         self.headers = get_headers(self.doc.get_text_regions())
 
+        # sezeni jazykoveho modelu, regiony a sloupce jsou tokenizovany a cteny jen jednou za dokument
+        session = lm_analyzer.session()
+
         # provedeni sloupcove analyzy
         reading_order = columnar_analyzer(doc)
         before_in_reading = reading_order.get_chain_reduction()
@@ -168,36 +176,20 @@ class ColumnarLmAnalyzer():
         # tyto regiony budou podlehat jazykove analyze
         last_in_cols = [x for x in self.doc.get_text_regions() if self.tbrr.is_last_in_col(x)]
 
-        for el in last_in_cols:
-            candidates = []
+        if self.prefetch:
+            self._prefetch(session, last_in_cols, before_in_reading)
 
-            # nactu dvojici (el, successor)
-            actual = find_by_fst(el, before_in_reading)
-            if not actual:
+        for el in last_in_cols:
+            query = self._get_query(el, before_in_reading)
+            if query is None:
                 continue
 
-            actual = actual[0]
+            actual, candidates = query
             # el, successor
             fst, snd = actual[0], actual[1]
 
-            # pridam aktualni napojeni
-            candidates.append(snd)
-            # pridam kandidaty z osy y
-            candidates += self._get_y_candidates(el)
-            # pridam kandidaty z osy x
-            candidates += self._get_x_candidates(el)
-            # pokud nektery z kandidatu byl ve sloupci, prevedu na sloupec
-            candidates = self._convert_to_col(candidates)
-
-            if len(candidates) == 1:
-                # zustal jen jeden kandidat a to ten aktualne ve dvojici
-                # pokracuju
-                continue
-
-            # priprava struktury pro odhad pravdepodobnosti
-            candidates = {c: self._get_element(c) for c in candidates}
             # jazykova analyza
-            probs = lm_analyzer.analyze_one(self.tbrr.get_col(el), candidates)
+            probs = session.analyze_one(self.tbrr.get_col(el), candidates)
 
             # vytahne se vitez
             winner = max(probs, key=probs.get)
@@ -220,6 +212,64 @@ class ColumnarLmAnalyzer():
         doc, lm = args
         return self.analyze(doc, lm)
 
+    def _get_query(self, el, before_in_reading):
+        """
+        Sestaveni dotazu jazykove analyzy pro posledni prvek sloupce, vraci dvojici (aktualni napojeni,
+        kandidati), pripadne None, pokud neni co porovnavat
+        """
+
+        candidates = []
+
+        # nactu dvojici (el, successor)
+        actual = find_by_fst(el, before_in_reading)
+        if not actual:
+            return None
+
+        actual = actual[0]
+
+        # pridam aktualni napojeni
+        candidates.append(actual[1])
+        # pridam kandidaty z osy y
+        candidates += self._get_y_candidates(el)
+        # pridam kandidaty z osy x
+        candidates += self._get_x_candidates(el)
+        # pokud nektery z kandidatu byl ve sloupci, prevedu na sloupec
+        candidates = self._convert_to_col(candidates)
+
+        if len(candidates) == 1:
+            # zustal jen jeden kandidat a to ten aktualne ve dvojici
+            return None
+
+        # priprava struktury pro odhad pravdepodobnosti
+        return actual, {c: self._get_element(c) for c in candidates}
+
+    def _prefetch(self, session, last_in_cols, before_in_reading):
+        """
+        Odhad dvojic vsech sloupcu jednim davkovym pruchodem modelu pred cyklem napojovani.
+        Kandidati z os x a y zavisi pouze na rozlozeni stranky, meni se jen aktualni naslednik, kterym se
+        po napojeni muze stat naslednik jineho sloupce. Kazdy sloupec je tedy odhadnut vuci svym kandidatum
+        z os x a y a vsem naslednikum vychoziho napojeni. Dotazy v cyklu napojovani jsou pak zodpovezeny
+        z cache sezeni, model je volan jen pro naslednika, ktery neni mezi temito kandidaty.
+        """
+
+        actual = {el: find_by_fst(el, before_in_reading) for el in last_in_cols}
+        successors = [pairs[0][1] for pairs in actual.values() if pairs]
+
+        queries = []
+        for el in last_in_cols:
+            if not actual[el]:
+                continue
+
+            col = self.tbrr.get_col(el)
+            candidates = self._convert_to_col(successors + self._get_y_candidates(el) + self._get_x_candidates(el))
+            # sloupec nemuze nasledovat sam sebe
+            candidates = [c for c in candidates if c != col.get_id()]
+
+            if len(candidates) > 1:
+                queries.append((col, {c: self._get_element(c) for c in candidates}))
+
+        session.analyze_many(queries)
+
     def _can_make_change(self, actual, probs, winner):
         """
         Metoda, kterou se overuje, zda jsou pravdepodobnosti vetsi, jak prah
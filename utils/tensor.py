@@ -0,0 +1,66 @@
+import torch
+import torch.nn.functional as F
+import torch.nn.utils.rnn as rnn_utils
+
+"""
+Pomocne funkce pro praci s pravdepodobnostmi kandidatu ruzne delky, zarovnanymi do jednoho tensoru
+(radek = kandidat) a doplnenymi o tensor delek. Maskovane operace pracuji s poslednim rozmerem, zarovnany
+tensor tedy muze mit i vice rozmeru (napr. source x kandidat x tokeny) a delky odpovidajici tvar bez posledniho
+rozmeru.
+"""
+
+
+def pad(probs: list) -> (torch.Tensor, torch.Tensor):
+    """
+    Zarovnani seznamu tensoru ruzne delky do jednoho tensoru, vraci dvojici (tensor, delky)
+    """
+
+    lengths = torch.tensor([len(x) for x in probs])
+    return rnn_utils.pad_sequence(probs, batch_first=True), lengths
+
+
+def unpad(probs: torch.Tensor, lengths: torch.Tensor) -> list:
+    """
+    Opak funkce pad, vraci seznam tensoru puvodnich delek
+    """
+
+    return [row[0:length] for row, length in zip(probs, lengths.tolist())]
+
+
+def cat(blocks: list) -> (torch.Tensor, torch.Tensor):
+    """
+    Spojeni vice zarovnanych bloku (tensor, delky) do jednoho, bloky jsou doplneny na nejvetsi sirku
+    """
+
+    if len(blocks) == 1:
+        return blocks[0]
+
+    width = max(probs.size(1) for probs, _ in blocks)
+    probs = torch.cat([F.pad(probs, (0, width - probs.size(1))) for probs, _ in blocks])
+
+    return probs, torch.cat([lengths for _, lengths in blocks])
+
+
+def mask(lengths: torch.Tensor, size: int, device=None) -> torch.Tensor:
+    """
+    Maska platnych pozic, pro kazdy radek True na prvnich length pozicich
+    """
+
+    lengths = lengths.to(device)
+    return torch.arange(size, device=device) < lengths.unsqueeze(-1)
+
+
+def masked_sum(probs: torch.Tensor, lengths: torch.Tensor) -> torch.Tensor:
+    """
+    Soucet prvnich length hodnot kazdeho radku
+    """
+
+    return probs.masked_fill(~mask(lengths, probs.size(-1), probs.device), 0).sum(dim=-1)
+
+
+def masked_mean(probs: torch.Tensor, lengths: torch.Tensor) -> torch.Tensor:
+    """
+    Prumer prvnich length hodnot kazdeho radku
+    """
+
+    return masked_sum(probs, lengths) / lengths.to(probs.device)
@@ -0,0 +1,50 @@
+import unittest
+
+import torch
+
+from utils.tensor import pad, unpad, cat, mask, masked_sum, masked_mean
+
+
+class TestTensor(unittest.TestCase):
+    def setUp(self):
+        self.probs = [torch.tensor([1., 2., 3.]), torch.tensor([4.]), torch.tensor([5., 6.])]
+
+    def test_pad(self):
+        probs, lengths = pad(self.probs)
+
+        self.assertEqual([[1., 2., 3.], [4., 0., 0.], [5., 6., 0.]], probs.tolist())
+        self.assertEqual([3, 1, 2], lengths.tolist())
+
+    def test_unpad(self):
+        for original, row in zip(self.probs, unpad(*pad(self.probs))):
+            self.assertTrue(torch.equal(original, row))
+
+    def test_cat(self):
+        probs, lengths = cat([pad(self.probs[0:2]), pad(self.probs[2:3])])
+
+        self.assertEqual([[1., 2., 3.], [4., 0., 0.], [5., 6., 0.]], probs.tolist())
+        self.assertEqual([3, 1, 2], lengths.tolist())
+
+    def test_cat_one_block(self):
+        block = pad(self.probs)
+        self.assertIs(block, cat([block]))
+
+    def test_mask(self):
+        self.assertEqual([[True, True, False], [False, False, False]], mask(torch.tensor([2, 0]), 3).tolist())
+
+    def test_masked_sum(self):
+        probs, lengths = pad(self.probs)
+        self.assertEqual([6., 4., 11.], masked_sum(probs, lengths).tolist())
+
+        # hodnoty za delkou radku nejsou zapocitany
+        self.assertEqual([3., 4., 5.], masked_sum(probs, torch.tensor([2, 1, 1])).tolist())
+
+    def test_masked_mean(self):
+        probs, lengths = pad(self.probs)
+        self.assertEqual([2., 4., 5.5], masked_mean(probs, lengths).tolist())
+
+    def test_masked_mean_last_dimension(self):
+        probs, lengths = pad(self.probs + [torch.tensor([7., 8., 9.])])
+        means = masked_mean(probs.view(2, 2, -1), lengths.view(2, 2))
+
+        self.assertEqual([[2., 4.], [5.5, 8.]], means.tolist())